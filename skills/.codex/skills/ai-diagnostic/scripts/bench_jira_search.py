@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_jira_server import add_server_args, build_fake, start_background
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_QUERIES = [
+    "增量同步 失败",
+    "timeout connecting",
+    "SnapshotSyncError delta upload",
+    "驱动加载失败",
+    "Permission denied volume",
+]
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[idx]
+
+
+def run_search(base_url, query, extra_args, env):
+    cmd = [
+        sys.executable,
+        os.path.join(SCRIPT_DIR, "jira_search.py"),
+        "--base-url",
+        base_url,
+        "--query",
+        query,
+    ] + extra_args
+    start = time.monotonic()
+    proc = subprocess.run(cmd, capture_output=True, text=True, env=env)
+    elapsed_ms = (time.monotonic() - start) * 1000
+    result = {"query": query, "elapsed_ms": round(elapsed_ms, 1), "ok": proc.returncode == 0}
+    try:
+        data = json.loads(proc.stdout)
+    except ValueError:
+        result["ok"] = False
+        result["error"] = (proc.stderr or proc.stdout).strip()[-500:]
+        return result
+    if "error" in data:
+        result["ok"] = False
+        result["error"] = data.get("detail") or data["error"]
+    result["count"] = data.get("count", 0)
+    result["http"] = data.get("http") or {}
+    return result
+
+
+def _sum_http(results):
+    totals = {}
+    for r in results:
+        for k, v in (r.get("http") or {}).items():
+            if isinstance(v, (int, float)):
+                totals[k] = totals.get(k, 0) + v
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end latency/throughput benchmark for jira_search.py")
+    parser.add_argument("--base-url", default="", help="benchmark an existing server instead of the bundled fake")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--query", action="append", default=[], help="query to run (repeatable, round-robin)")
+    parser.add_argument(
+        "--search-args",
+        default="--no-cache",
+        help="extra arguments passed to jira_search.py, e.g. \"--pages 4 --fan-out 2\"",
+    )
+    add_server_args(parser)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    fake = None
+    if not base_url:
+        fake = build_fake(args)
+        server, base_url = start_background(fake)
+
+    env = dict(os.environ)
+    env.setdefault("JIRA_USER", "bench")
+    env.setdefault("JIRA_PASS", "bench")
+    if fake is not None:
+        env["JIRA_PROJECT_KEYS"] = args.projects
+    extra_args = shlex.split(args.search_args)
+    queries = args.query or DEFAULT_QUERIES
+
+    try:
+        for i in range(args.warmup):
+            run_search(base_url, queries[i % len(queries)], extra_args, env)
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+            futures = [
+                executor.submit(run_search, base_url, queries[i % len(queries)], extra_args, env)
+                for i in range(args.iterations)
+            ]
+            results = [f.result() for f in futures]
+        wall_s = time.monotonic() - start
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    latencies = [r["elapsed_ms"] for r in results if r["ok"]]
+    errors = [r for r in results if not r["ok"]]
+    report = {
+        "base_url": base_url,
+        "search_args": extra_args,
+        "iterations": args.iterations,
+        "concurrency": args.concurrency,
+        "ok": len(latencies),
+        "errors": len(errors),
+        "wall_s": round(wall_s, 3),
+        "throughput_qps": round(len(latencies) / wall_s, 2) if wall_s else 0,
+        "latency_ms": {
+            "min": min(latencies) if latencies else 0,
+            "p50": _percentile(latencies, 50),
+            "p90": _percentile(latencies, 90),
+            "p99": _percentile(latencies, 99),
+            "max": max(latencies) if latencies else 0,
+            "mean": round(sum(latencies) / len(latencies), 1) if latencies else 0,
+        },
+        "http": _sum_http(results),
+        "error_samples": [e.get("error", "") for e in errors[:3]],
+    }
+    if fake is not None:
+        report["server"] = dict(fake.stats, issues=len(fake.issues), latency_ms=args.latency_ms, throttle_every=args.throttle_every)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if errors and not latencies:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
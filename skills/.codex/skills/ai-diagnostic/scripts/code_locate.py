@@ -1,13 +1,23 @@
 #!/usr/bin/env python3
 import argparse
+import base64
+import fcntl
 import json
 import os
 import re
+import shutil
+import sqlite3
 import subprocess
 import sys
+import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 
+from remote_heads import DEFAULT_TTL, HeadsCache, ls_remote_heads
+from symbol_index import SymbolIndex
+
 REPO_MAP = {
     "newmuse": "hypermotion/newmuse",
     "owl": "hypermotion/owl",
@@ -31,6 +41,21 @@ REPO_MAP = {
 
 DEFAULT_BASE = "http://192.168.10.254:20080"
 
+# vendored binaries/history make full checkouts of these slow: partial + sparse by default
+LARGE_REPOS = {"atomy/hamalv3", "hypermotion/windows-agent"}
+SOURCE_EXTS = {
+    "python": [".py"],
+    "go": [".go"],
+    "java": [".java"],
+    "csharp": [".cs"],
+    "c": [".c", ".h", ".cc", ".cpp", ".hpp"],
+    "shell": [".sh", ".ps1", ".bat"],
+    "js": [".js", ".ts"],
+}
+CONFIG_PATTERNS = ["*.yaml", "*.yml", "*.json", "*.ini", "*.conf", "*.properties", "*.xml", "*.toml", "*.sql"]
+VENDOR_DIRS = ["vendor", "third_party", "thirdparty", "node_modules", "packages"]
+RELEASE_RE = re.compile(r"^(HyperBDR|HyperMotion)_release_v(\d+(?:\.\d+)*)$")
+
 
 def _normalize_module(name: str) -> str:
     return name.strip().lower()
@@ -53,69 +78,601 @@ def _branch_candidates(product: str, version: str):
     return candidates
 
 
-def _ls_remote_branches(repo_url: str):
-    try:
-        out = subprocess.check_output(
-            ["git", "ls-remote", "--heads", repo_url],
-            stderr=subprocess.STDOUT,
-            text=True,
-            timeout=20,
-        )
-    except Exception:
-        return []
-    branches = []
-    for line in out.splitlines():
-        parts = line.split("\t")
-        if len(parts) == 2 and parts[1].startswith("refs/heads/"):
-            branches.append(parts[1].replace("refs/heads/", ""))
-    return branches
+class RepoLocks:
+    """Per-repo flock locks under CODE_WORKDIR/locks, shared between processes.
 
+    Fetching a mirror and checking out or rebuilding a worktree take the lock
+    exclusively; searches hold it shared, so parallel diagnoses of one module
+    only wait for each other while the checkout they search is being changed.
+    Locks are always taken mirror first, then worktree. Every acquisition is
+    recorded with its wait and hold time."""
 
-def _select_branch(candidates, remote_branches):
-    for c in candidates:
-        if c in remote_branches:
-            return c
-    return candidates[0] if candidates else "master"
+    def __init__(self, workdir: Path, timeout: float = 600.0):
+        self.lock_dir = workdir / "locks"
+        self.timeout = timeout
+        self.events = []
+
+    @contextmanager
+    def hold(self, key: str, exclusive: bool = False):
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        handle = open(self.lock_dir / f"{key.replace('/', '__')}.lock", "a+")
+        mode = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        start = time.monotonic()
+        try:
+            while True:
+                try:
+                    fcntl.flock(handle, mode | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() - start > self.timeout:
+                        raise TimeoutError(f"lock {key} busy for more than {self.timeout:g}s")
+                    time.sleep(0.05)
+        except BaseException:
+            handle.close()
+            raise
+        acquired = time.monotonic()
+        event = {
+            "lock": key,
+            "mode": "exclusive" if exclusive else "shared",
+            "wait_ms": int((acquired - start) * 1000),
+        }
+        self.events.append(event)
+        try:
+            yield handle
+        finally:
+            event["held_ms"] = int((time.monotonic() - acquired) * 1000)
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            handle.close()
+
+    def report(self):
+        waits = [e["wait_ms"] for e in self.events]
+        return {
+            "acquired": len(self.events),
+            "wait_ms": sum(waits),
+            "max_wait_ms": max(waits) if waits else 0,
+            "events": self.events,
+        }
 
 
 def _run(cmd, cwd=None):
     return subprocess.check_output(cmd, cwd=cwd, stderr=subprocess.STDOUT, text=True)
 
 
-def _ensure_repo(clone_dir: Path, repo_url: str, branch: str):
-    if clone_dir.exists() and (clone_dir / ".git").exists():
+def _git_auth_env(base_url: str, user: str, password: str):
+    """Credentials as a process-level url.<auth>.insteadOf rewrite.
+
+    Mirrors record the plain URL as `origin` (partial clones need a promisor remote
+    for on-demand blob fetches); git and its lazy fetches pick the credentials up
+    from the environment, so they are never written to disk."""
+    if not user or not password:
+        return {}
+    parsed = urllib.parse.urlsplit(base_url)
+    auth = f"{urllib.parse.quote(user, safe='')}:{urllib.parse.quote(password, safe='')}@{parsed.netloc}"
+    count = int(os.environ.get("GIT_CONFIG_COUNT", "0") or 0)
+    return {
+        "GIT_CONFIG_COUNT": str(count + 1),
+        f"GIT_CONFIG_KEY_{count}": f"url.{parsed._replace(netloc=auth).geturl().rstrip('/')}/.insteadOf",
+        f"GIT_CONFIG_VALUE_{count}": base_url.rstrip("/") + "/",
+    }
+
+
+def _git(args, cwd=None):
+    return _run(["git"] + args, cwd=cwd)
+
+
+def _fetch_branch(mirror: Path, branch: str, partial: bool):
+    _fetch_branches(mirror, [branch], partial)
+
+
+def _fetch_branches(mirror: Path, branches, partial: bool):
+    cmd = ["fetch", "--prune", "--no-tags"]
+    if partial:
+        # commits and trees only; blobs arrive on demand from the promisor remote
+        cmd.append("--filter=blob:none")
+    refspecs = [f"+refs/heads/{b}:refs/remotes/origin/{b}" for b in branches]
+    _git(cmd + ["origin"] + refspecs, cwd=str(mirror))
+
+
+def _local_head(mirror: Path, branch: str):
+    try:
+        return _git(["rev-parse", "--verify", "-q", f"refs/remotes/origin/{branch}"], cwd=str(mirror)).strip()
+    except subprocess.CalledProcessError:
+        return ""
+
+
+def _mirror_current(mirror: Path, repo_url: str, branch: str, partial: bool = False, remote_sha=None):
+    """Whether the existing mirror is set up for `repo_url` and already holds the
+    remote head of `branch` (`remote_sha`, or one `ls-remote` of the branch).
+
+    Only reads the mirror, so it runs before any lock is taken; raises when the
+    remote cannot be listed."""
+    if not (mirror / "HEAD").exists():
+        return False, remote_sha
+    config = (mirror / "config").read_text(encoding="utf-8", errors="replace")
+    if f"url = {repo_url}" not in config or (partial and "promisor = true" not in config):
+        return False, remote_sha
+    if remote_sha is None:
+        remote_sha = ls_remote_heads("origin", [f"refs/heads/{branch}"], cwd=str(mirror)).get(branch)
+    return bool(remote_sha) and remote_sha == _local_head(mirror, branch), remote_sha
+
+
+def _ensure_mirror(mirror: Path, repo_url: str, branch: str, partial: bool = False, remote_sha=None):
+    """Create/configure the mirror and bring origin/<branch> up to date.
+
+    Returns (created, fetch_skipped): the fetch is skipped when `remote_sha`
+    already equals the mirrored ref, e.g. another run fetched it meanwhile."""
+    created = False
+    if not (mirror / "HEAD").exists():
+        if mirror.exists():
+            shutil.rmtree(mirror, ignore_errors=True)
+        mirror.parent.mkdir(parents=True, exist_ok=True)
+        _git(["init", "--bare", "-q", str(mirror)])
+        created = True
+    config = (mirror / "config").read_text(encoding="utf-8", errors="replace")
+    if f"url = {repo_url}" not in config:
+        _git(["config", "remote.origin.url", repo_url], cwd=str(mirror))
+    if partial and "promisor = true" not in config:
+        _git(["config", "remote.origin.promisor", "true"], cwd=str(mirror))
+        _git(["config", "remote.origin.partialclonefilter", "blob:none"], cwd=str(mirror))
+    if not created and remote_sha and remote_sha == _local_head(mirror, branch):
+        return created, True
+    _fetch_branch(mirror, branch, partial)
+    return created, False
+
+
+def _sparse_patterns(mirror: Path, ref: str, languages):
+    """Non-cone sparse-checkout patterns for the repo's source languages.
+
+    "auto" picks the languages present in the tree; listing names needs only tree
+    objects, which a blob:none mirror already has."""
+    if languages == ["auto"]:
+        names = _git(["ls-tree", "-r", "--name-only", ref], cwd=str(mirror)).splitlines()
+        exts = {os.path.splitext(n)[1].lower() for n in names}
+        languages = [lang for lang, lang_exts in SOURCE_EXTS.items() if exts.intersection(lang_exts)]
+    patterns = [f"*{ext}" for lang in languages for ext in SOURCE_EXTS.get(lang, [])]
+    return patterns + CONFIG_PATTERNS + [f"!**/{d}/**" for d in VENDOR_DIRS], languages
+
+
+def _grep_pathspecs(patterns):
+    # the sparse-checkout patterns as `git grep` pathspecs: both match at any depth
+    return [f":(exclude,glob){p[1:]}" if p.startswith("!") else f":(glob)**/{p}" for p in patterns]
+
+
+def _is_partial(mirror: Path):
+    try:
+        return _git(["config", "--get", "remote.origin.promisor"], cwd=str(mirror)).strip() == "true"
+    except subprocess.CalledProcessError:
+        return False
+
+
+def _worktree_dir(workdir: Path, name: str, branch: str) -> Path:
+    return workdir / "worktrees" / name / branch.replace("/", "__")
+
+
+def _ensure_worktree(mirror: Path, worktree: Path, branch: str, sparse=None):
+    ref = f"origin/{branch}"
+    if (worktree / ".git").exists():
         try:
-            _run(["git", "fetch", "--all", "--prune"], cwd=str(clone_dir))
-            _run(["git", "checkout", branch], cwd=str(clone_dir))
-            _run(["git", "pull", "--ff-only"], cwd=str(clone_dir))
-            return
-        except Exception:
-            pass
-    if clone_dir.exists():
-        # best-effort cleanup if previous clone failed
-        for _ in range(1):
-            try:
-                subprocess.check_call(["rm", "-rf", str(clone_dir)])
-            except Exception:
-                break
-    _run(["git", "clone", "--depth", "1", "--branch", branch, repo_url, str(clone_dir)])
+            target = _git(["rev-parse", ref], cwd=str(mirror)).strip()
+            if _git(["rev-parse", "HEAD"], cwd=str(worktree)).strip() != target:
+                _git(["checkout", "-q", "--force", "--detach", target], cwd=str(worktree))
+            if sparse:
+                current = _git(["sparse-checkout", "list"], cwd=str(worktree)).splitlines()
+                if current != sparse:
+                    _git(["sparse-checkout", "set", "--no-cone"] + sparse, cwd=str(worktree))
+            elif (worktree / ".git").is_file() and _is_sparse(worktree):
+                _git(["sparse-checkout", "disable"], cwd=str(worktree))
+            return False
+        except subprocess.CalledProcessError:
+            shutil.rmtree(worktree, ignore_errors=True)
+    elif worktree.exists():
+        shutil.rmtree(worktree, ignore_errors=True)
+    _git(["worktree", "prune"], cwd=str(mirror))
+    worktree.parent.mkdir(parents=True, exist_ok=True)
+    # detached: the mirror keeps updating refs/remotes/origin/* without tripping
+    # over branches that are checked out in some worktree
+    if not sparse:
+        _git(["worktree", "add", "-q", "--force", "--detach", str(worktree), ref], cwd=str(mirror))
+        return True
+    # sparse: set patterns before the first checkout so excluded blobs are never fetched
+    _git(["worktree", "add", "-q", "--force", "--detach", "--no-checkout", str(worktree), ref], cwd=str(mirror))
+    _git(["sparse-checkout", "set", "--no-cone"] + sparse, cwd=str(worktree))
+    _git(["checkout", "-q", "--force", "--detach", ref], cwd=str(worktree))
+    return True
+
+
+def _worktree_current(mirror: Path, worktree: Path, branch: str, sparse=None):
+    """True when the worktree already sits at origin/<branch> with the wanted sparse patterns."""
+    if not (worktree / ".git").is_file():
+        return False
+    try:
+        target = _git(["rev-parse", f"origin/{branch}"], cwd=str(mirror)).strip()
+        if _git(["rev-parse", "HEAD"], cwd=str(worktree)).strip() != target:
+            return False
+        if sparse:
+            return _git(["sparse-checkout", "list"], cwd=str(worktree)).splitlines() == sparse
+    except subprocess.CalledProcessError:
+        return False
+    return not _is_sparse(worktree)
 
 
-def _rg_hits(repo_dir: Path, term: str, max_count: int = 5):
-    if not term:
-        return []
-    cmd = ["rg", "-n", "--max-count", str(max_count), term, str(repo_dir)]
+def _is_repo(path: Path):
     try:
-        out = _run(cmd)
-    except Exception:
+        _git(["rev-parse", "--git-dir"], cwd=str(path))
+        return True
+    except (subprocess.CalledProcessError, OSError):
+        return False
+
+
+def _is_sparse(worktree: Path):
+    try:
+        return _git(["config", "--get", "core.sparseCheckout"], cwd=str(worktree)).strip() == "true"
+    except subprocess.CalledProcessError:
+        return False
+
+
+def _mirror_heads(mirror: Path):
+    """{branch: sha} of the branches already fetched into the mirror."""
+    try:
+        out = _git(["for-each-ref", "--format=%(refname:strip=3) %(objectname)", "refs/remotes/origin/"], cwd=str(mirror))
+    except subprocess.CalledProcessError:
+        return {}
+    return dict(line.split(" ", 1) for line in out.splitlines() if " " in line and not line.startswith("HEAD "))
+
+
+def _cached_checkout(workdir: Path, name: str, candidates):
+    """An existing worktree to search without touching the remote or the mirror.
+
+    The first branch candidate with a worktree wins, otherwise the most recently
+    updated worktree of the repo. Returns (branch, worktree, info), or
+    (None, None, None) when the repo was never checked out."""
+    worktree = next(
+        (w for w in (_worktree_dir(workdir, name, b) for b in candidates) if (w / ".git").is_file()),
+        None,
+    )
+    if worktree is None:
+        root = workdir / "worktrees" / name
+        found = [w for w in root.iterdir() if (w / ".git").is_file()] if root.is_dir() else []
+        if not found:
+            return None, None, None
+        worktree = max(found, key=lambda w: w.stat().st_mtime)
+    info = {
+        "mirror_path": str(workdir / "mirrors" / f"{name}.git"),
+        "cached_only": True,
+        "fetched": False,
+        "sparse": _is_sparse(worktree),
+    }
+    return worktree.name.replace("__", "/"), worktree, info
+
+
+def _ensure_repo(
+    workdir: Path,
+    name: str,
+    repo_url: str,
+    branch: str,
+    partial: bool = False,
+    sparse=None,
+    remote_sha=None,
+    locks=None,
+):
+    """One bare mirror per module plus a worktree per branch sharing its object store.
+
+    Switching between release branches only fetches the branch delta and checks out
+    a worktree; a failed fetch falls back to the last checkout of that branch.
+    `partial` fetches without blobs (--filter=blob:none) and `sparse` (languages or
+    ["auto"]) limits the worktree to source/config files of those languages.
+    Unchanged branches skip the fetch and checkout (`fetch_skipped`); `remote_sha`
+    saves the `ls-remote` when the caller already listed the remote heads.
+    The remote is compared before any lock is taken, and the mirror is only
+    locked exclusively when it has to be fetched; the worktree likewise only
+    when it actually has to move. Lock waits past the timeout raise TimeoutError."""
+    locks = locks or RepoLocks(workdir)
+    start = time.monotonic()
+    mirror = workdir / "mirrors" / f"{name}.git"
+    worktree = _worktree_dir(workdir, name, branch)
+    info = {
+        "mirror_path": str(mirror),
+        "mirror_created": False,
+        "fetched": False,
+        "fetch_skipped": False,
+        "stale": False,
+        "partial": partial,
+        "sparse_languages": None,
+    }
+    worktree_key = f"{name}@{branch}"
+    info["worktree_created"] = False
+    # the network round trip happens outside the lock, so parallel runs of an
+    # up-to-date module never queue behind each other's ls-remote
+    try:
+        info["fetch_skipped"], remote_sha = _mirror_current(mirror, repo_url, branch, partial, remote_sha)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        # unreachable remote (or unreadable mirror): an existing checkout will do
+        info["stale"] = (worktree / ".git").exists()
+    with locks.hold(name, exclusive=not (info["fetch_skipped"] or info["stale"])):
+        if not (info["fetch_skipped"] or info["stale"]):
+            try:
+                info["mirror_created"], info["fetch_skipped"] = _ensure_mirror(
+                    mirror, repo_url, branch, partial, remote_sha
+                )
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+                if (worktree / ".git").exists():
+                    info["stale"] = True
+                elif mirror.exists() and not _is_repo(mirror):
+                    # corrupt mirror: rebuild it; worktrees of other branches re-create
+                    # themselves (under their own lock) once their checkout fails
+                    shutil.rmtree(mirror, ignore_errors=True)
+                    info["mirror_created"], info["fetch_skipped"] = _ensure_mirror(mirror, repo_url, branch, partial)
+                else:
+                    raise
+        info["fetched"] = not (info["stale"] or info["fetch_skipped"])
+        if not info["stale"]:
+            patterns = None
+            if sparse:
+                patterns, info["sparse_languages"] = _sparse_patterns(mirror, f"origin/{branch}", sparse)
+            with locks.hold(worktree_key):
+                current = _worktree_current(mirror, worktree, branch, patterns)
+            if not current:
+                with locks.hold(worktree_key, exclusive=True):
+                    info["worktree_created"] = _ensure_worktree(mirror, worktree, branch, patterns)
+    info["elapsed_ms"] = int((time.monotonic() - start) * 1000)
+    return worktree, info
+
+
+def _line_context(clone_dir: Path, commit: str, path: str, line: int, radius: int):
+    """Lines around a hit; files outside a sparse checkout are read from the object
+    store, which fetches the blob on demand in a partial clone."""
+    if not line or radius <= 0:
         return []
-    hits = []
-    for line in out.splitlines():
-        # format: path:line:text
-        parts = line.split(":", 2)
-        if len(parts) == 3:
-            hits.append({"file": parts[0], "line": int(parts[1]), "text": parts[2]})
-    return hits
+    full = clone_dir / path
+    try:
+        text = full.read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        try:
+            text = _git(["show", f"{commit}:{path}"], cwd=str(clone_dir))
+        except subprocess.CalledProcessError:
+            return []
+    lines = text.splitlines()
+    lo = max(1, line - radius)
+    return [f"{n}: {lines[n - 1]}" for n in range(lo, min(len(lines), line + radius) + 1)]
+
+
+def _rg_text(obj):
+    # rg --json carries non-UTF-8 paths/lines as base64 "bytes"
+    if not obj:
+        return ""
+    if "text" in obj:
+        return obj["text"]
+    return base64.b64decode(obj.get("bytes", "")).decode("utf-8", errors="replace")
+
+
+def _term_matcher(term: str):
+    try:
+        pattern = re.compile(term)
+    except re.error:
+        return lambda text: term in text
+    return lambda text: pattern.search(text) is not None
+
+
+def _rg_hits(repo_dir: Path, terms, limits):
+    """Search all terms in one ripgrep pass and attribute matches back to terms.
+
+    Each line is re-tested against every term rather than read from rg's
+    submatches, where the leftmost alternative wins (`Connection` would take
+    every `ConnectionError` hit). `limits` caps hits per (term, file), like the
+    old per-term `--max-count`; rg itself gets no `--max-count`, since one
+    per-file budget would be spent on common terms before a rare class or method
+    name further down the file is reached. Once every term has its hits in a
+    file, the rest of that file's matches are skipped without being decoded.
+    Returns ({term: [hits]}, stats)."""
+    by_term = {t: [] for t in terms}
+    stats = {"patterns": len(terms), "matched_lines": 0, "elapsed_ms": 0}
+    if not terms:
+        return by_term, stats
+    start = time.monotonic()
+    cmd = ["rg", "--json"]
+    for t in terms:
+        cmd.extend(["-e", t])
+    cmd.append(str(repo_dir))
+    matchers = [(t, _term_matcher(t)) for t in terms]
+    per_file = {}
+    # rg --json reports a file's matches between its "begin" and "end" events
+    saturated = False
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, encoding="utf-8")
+    except OSError:
+        return by_term, stats
+    with proc:
+        for raw in proc.stdout:
+            if saturated and raw.startswith('{"type":"match"'):
+                continue
+            try:
+                event = json.loads(raw)
+            except ValueError:
+                continue
+            if event.get("type") != "match":
+                saturated = False
+                continue
+            data = event["data"]
+            path = _rg_text(data.get("path"))
+            text = _rg_text(data.get("lines")).rstrip("\r\n")
+            stats["matched_lines"] += 1
+            for term, matches in matchers:
+                count = per_file.get((term, path), 0)
+                if count >= limits[term] or not matches(text):
+                    continue
+                per_file[(term, path)] = count + 1
+                by_term[term].append({"file": path, "line": data.get("line_number"), "text": text, "term": term})
+            saturated = all(per_file.get((t, path), 0) >= limits[t] for t in terms)
+    stats["elapsed_ms"] = int((time.monotonic() - start) * 1000)
+    return by_term, stats
+
+
+def _per_file(hits, max_count):
+    counts = {}
+    kept = []
+    for h in hits:
+        counts[h["file"]] = counts.get(h["file"], 0) + 1
+        if counts[h["file"]] <= max_count:
+            kept.append(h)
+    return kept
+
+
+def _release_branches(heads, product: str, limit: int):
+    """Newest release branches on the remote, optionally for one product."""
+    found = []
+    for branch in heads:
+        m = RELEASE_RE.match(branch)
+        if m and (not product or m.group(1).lower() == product.lower()):
+            found.append((tuple(int(x) for x in m.group(2).split(".")), branch))
+    found.sort(reverse=True)
+    return [b for _, b in found[:limit]]
+
+
+def _grep_ref(mirror: Path, commit: str, terms, max_hits: int, pathspecs=()):
+    """`git grep` one commit's tree in the bare mirror; per-term counts and samples."""
+    found = {t: {"count": 0, "files": set(), "samples": []} for t in terms}
+    # -z: "<commit>:<path>\0<line>\0<text>", so colons in paths or text cannot shift fields
+    cmd = ["git", "grep", "-I", "-n", "-z", "--full-name", "-F"]
+    for t in terms:
+        cmd.extend(["-e", t])
+    cmd.extend([commit, "--"] + list(pathspecs))
+    prefix = f"{commit}:"
+    proc = subprocess.Popen(
+        cmd, cwd=str(mirror), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, errors="replace"
+    )
+    with proc:
+        for raw in proc.stdout:
+            parts = raw.rstrip("\r\n").split("\0", 2)
+            if len(parts) != 3 or not parts[0].startswith(prefix) or not parts[1].isdigit():
+                continue
+            path, line, text = parts[0][len(prefix) :], parts[1], parts[2]
+            for t in terms:
+                if t not in text:
+                    continue
+                entry = found[t]
+                entry["count"] += 1
+                entry["files"].add(path)
+                if len(entry["samples"]) < max_hits:
+                    entry["samples"].append({"file": path, "line": int(line), "text": text.strip()[:200]})
+    return found
+
+
+def _version_matrix(result, args, repo_path: str):
+    """Which release branches still contain the hit terms: version x term counts.
+
+    Release branches come from the cached remote listing; missing or outdated
+    ones are fetched into the module mirror in one go, then every commit is
+    searched with `git grep` against its tree, in parallel and without touching
+    any worktree. In a partial clone the blobs being searched are downloaded on
+    first use, so the grep is limited to the source/config files a sparse
+    worktree would hold."""
+    start = time.monotonic()
+    mirror = Path(result["repo_cache"]["mirror_path"])
+    user = os.environ.get("GIT_USER", "")
+    password = os.environ.get("GIT_PASS", "")
+    if args.cached_only:
+        heads, heads_info = _mirror_heads(mirror), {"cached_only": True}
+    else:
+        heads, heads_info = HeadsCache(ttl=args.heads_ttl, refresh=args.refresh_heads).heads(
+            result["repo_url"], _auth_url(args.base_url, repo_path, user, password)
+        )
+    branches = _release_branches(heads, args.product, args.matrix_max)
+    if result["selected_branch"] in heads and result["selected_branch"] not in branches:
+        branches.append(result["selected_branch"])
+
+    terms = list(result["search_terms"])
+    # the matched log template fragment pins the offending code best
+    key_term = result["log_sites"][0]["matched"] if result.get("log_sites") else ""
+    if key_term and key_term not in terms:
+        terms.insert(0, key_term)
+    key_term = key_term or args.method_name or args.class_name or (terms[0] if terms else "")
+    matrix = {"terms": terms, "key_term": key_term, "heads_cache": heads_info, "rows": [], "fetched": []}
+    if not terms or not branches:
+        matrix["elapsed_ms"] = int((time.monotonic() - start) * 1000)
+        return matrix
+
+    locks = RepoLocks(Path(args.workdir), args.lock_timeout)
+    name = repo_path.replace("/", "_")
+    outdated = [b for b in branches if heads.get(b) != _local_head(mirror, b)]
+    if outdated:
+        try:
+            with locks.hold(name, exclusive=True):
+                _fetch_branches(mirror, outdated, result["repo_cache"].get("partial", False))
+            matrix["fetched"] = outdated
+        except (subprocess.CalledProcessError, OSError, TimeoutError) as e:
+            matrix["fetch_error"] = str(e)[:200]
+
+    commits = [(b, _local_head(mirror, b)) for b in branches]
+    commits = [(b, c) for b, c in commits if c]
+    pathspecs = []
+    if commits and _is_partial(mirror):
+        # every blob git grep reads is a round trip to the promisor remote: keep to the
+        # source/config files a sparse worktree of this repo would check out
+        languages = result["repo_cache"].get("sparse_languages") or ["auto"]
+        try:
+            patterns, languages = _sparse_patterns(mirror, commits[0][1], languages)
+            pathspecs = _grep_pathspecs(patterns)
+            matrix["pathspec_languages"] = languages
+        except subprocess.CalledProcessError:
+            pass
+
+    def run(item):
+        branch, commit = item
+        t0 = time.monotonic()
+        found = _grep_ref(mirror, commit, terms, args.max_hits, pathspecs)
+        m = RELEASE_RE.match(branch)
+        return {
+            "branch": branch,
+            "version": m.group(2) if m else "",
+            "commit": commit,
+            "hits": {t: found[t]["count"] for t in terms},
+            "files": {t: len(found[t]["files"]) for t in terms},
+            "contains_key_term": found[key_term]["count"] > 0 if key_term in found else False,
+            "samples": [h for t in terms for h in found[t]["samples"]][: args.max_hits],
+            "elapsed_ms": int((time.monotonic() - t0) * 1000),
+        }
+
+    try:
+        # shared: a concurrent fetch must not repack objects under git grep
+        with locks.hold(name), ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            matrix["rows"] = list(executor.map(run, commits))
+    except TimeoutError as e:
+        matrix["error"] = str(e)
+    matrix["locks"] = locks.report()
+    matrix["elapsed_ms"] = int((time.monotonic() - start) * 1000)
+    return matrix
+
+
+def _symbol_lookup(workdir: Path, name: str, clone_dir: Path, repo_cache, args, locks):
+    """Resolve --class/--method, their call chains and log templates from the per-commit symbol index."""
+    index = None
+    commit = repo_cache["commit"]
+    sparse = repo_cache.get("sparse", bool(repo_cache.get("sparse_languages")))
+    try:
+        # one writer per index: concurrent runs would parse the same commit twice, and
+        # opening it may rebuild the tables of an older INDEX_VERSION
+        with locks.hold(f"{name}.index{'.sparse' if sparse else ''}", exclusive=True):
+            # sparse worktrees index only what is checked out; keep them apart from full indexes
+            index = SymbolIndex(str(workdir / "index" / f"{name}{'.sparse' if sparse else ''}.db"))
+            stats = index.update(str(clone_dir), commit, materialized_only=sparse)
+        start = time.monotonic()
+        definitions = index.lookup(commit, args.class_name, args.method_name)
+        log_sites = index.log_sites(commit, args.query)
+        chains = index.call_chains(commit, args.class_name, args.method_name, depth=args.chain_depth)
+        stats["lookup_ms"] = round((time.monotonic() - start) * 1000, 2)
+    except (OSError, sqlite3.Error, subprocess.CalledProcessError) as e:
+        return [], [], {"upstream": [], "downstream": []}, {"error": str(e)}
+    finally:
+        if index is not None:
+            index.close()
+    nodes = [n for chain in chains["upstream"] + chains["downstream"] for n in chain]
+    for item in definitions + log_sites:
+        context = _line_context(clone_dir, commit, item["file"], item.get("line"), args.context)
+        if context:
+            item["context"] = context
+    for item in definitions + log_sites + nodes:
+        item["file"] = str(clone_dir / item["file"])
+    return definitions, log_sites, chains, stats
 
 
 def _extract_terms(query, class_name, method_name):
@@ -135,82 +692,299 @@ def _extract_terms(query, class_name, method_name):
     return filtered[:10]
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Locate code by module and error keywords")
-    parser.add_argument("--module", required=True)
-    parser.add_argument("--product", default="")
-    parser.add_argument("--version", default="")
-    parser.add_argument("--query", default="", help="error text or keywords")
-    parser.add_argument("--class", dest="class_name", default="")
-    parser.add_argument("--method", dest="method_name", default="")
-    parser.add_argument("--base-url", default=os.environ.get("GIT_BASE_URL", DEFAULT_BASE))
-    parser.add_argument("--workdir", default=os.environ.get("CODE_WORKDIR", "/tmp/onepro-code"))
-    parser.add_argument("--list-branches", action="store_true")
-    parser.add_argument("--max-hits", type=int, default=5)
-    args = parser.parse_args()
+def _repo_options(repo_path: str, args):
+    large = repo_path in LARGE_REPOS
+    partial = args.partial == "on" or (args.partial == "auto" and large)
+    sparse = None
+    if args.sparse == "all" or (args.sparse == "auto" and large):
+        sparse = ["auto"]
+    elif args.sparse not in ("auto", "off", ""):
+        sparse = [s.strip() for s in args.sparse.split(",") if s.strip()]
+    return partial, sparse
 
-    module_key = _normalize_module(args.module)
-    if module_key not in REPO_MAP:
-        print(json.dumps({"error": "unknown module", "module": args.module}, ensure_ascii=False))
-        sys.exit(1)
 
-    repo_path = REPO_MAP[module_key]
+def locate(module: str, repo_path: str, args, workdir: Path, list_branches: bool):
+    """Check out the module's branch and search it; returns the code_locate output dict."""
     user = os.environ.get("GIT_USER", "")
     password = os.environ.get("GIT_PASS", "")
-
     repo_url_auth = _auth_url(args.base_url, repo_path, user, password)
     repo_url_display = f"{args.base_url}/{repo_path}.git"
+    partial, sparse = _repo_options(repo_path, args)
 
     candidates = _branch_candidates(args.product, args.version)
-    remote_branches = []
+    remote_heads, heads_info = {}, {"skipped": True}
     selected = candidates[0] if candidates else "master"
-    if args.list_branches:
-        remote_branches = _ls_remote_branches(repo_url_auth)
-        if remote_branches:
-            selected = _select_branch(candidates, remote_branches)
+    locks = RepoLocks(workdir, args.lock_timeout)
+    if args.cached_only:
+        # no ls-remote, fetch or checkout: search whatever worktree is already there
+        selected, clone_dir, repo_cache = _cached_checkout(workdir, repo_path.replace("/", "_"), candidates)
+        if clone_dir is None:
+            return {"error": "not_cached", "repo_url": repo_url_display, "branch_candidates": candidates}
+    else:
+        if list_branches:
+            cache = HeadsCache(ttl=args.heads_ttl, refresh=args.refresh_heads)
+            selected, remote_heads, heads_info = cache.resolve(repo_url_display, candidates, repo_url_auth)
+        # a cached listing may lag the remote: only a fresh one can stand in for the freshness check
+        remote_sha = remote_heads.get(selected) if not heads_info.get("cached") else None
 
-    workdir = Path(args.workdir)
-    workdir.mkdir(parents=True, exist_ok=True)
-    clone_dir = workdir / repo_path.replace("/", "_")
-
-    try:
-        _ensure_repo(clone_dir, repo_url_auth, selected)
-    except Exception as e:
-        print(
-            json.dumps(
-                {
-                    "error": "clone_failed",
-                    "repo_url": repo_url_display,
-                    "branch": selected,
-                    "detail": str(e),
-                },
-                ensure_ascii=False,
+        try:
+            clone_dir, repo_cache = _ensure_repo(
+                workdir,
+                repo_path.replace("/", "_"),
+                repo_url_display,
+                selected,
+                partial,
+                sparse,
+                remote_sha,
+                locks,
             )
-        )
-        sys.exit(1)
-
+        except TimeoutError as e:
+            return {
+                "error": "lock_timeout",
+                "repo_url": repo_url_display,
+                "branch": selected,
+                "detail": str(e),
+                "locks": locks.report(),
+            }
+        except Exception as e:
+            return {
+                "error": "clone_failed",
+                "repo_url": repo_url_display,
+                "branch": selected,
+                "detail": str(e),
+                "locks": locks.report(),
+            }
+
+    definitions, log_sites, index_stats = [], [], {"skipped": True}
+    call_chains = {"upstream": [], "downstream": []}
     terms = _extract_terms(args.query, args.class_name, args.method_name)
+    try:
+        # the checkout must not move while it is indexed and searched, nor the mirror
+        # whose objects it borrows be fetched into or repacked underneath it
+        name = repo_path.replace("/", "_")
+        with locks.hold(name), locks.hold(f"{name}@{selected}"):
+            repo_cache["commit"] = _git(["rev-parse", "HEAD"], cwd=str(clone_dir)).strip()
+            if not args.no_index:
+                definitions, log_sites, call_chains, index_stats = _symbol_lookup(
+                    workdir, name, clone_dir, repo_cache, args, locks
+                )
+
+            # one ripgrep pass covers both the term hits and the method call-site candidates
+            limits = {t: args.max_hits for t in terms}
+            if args.method_name:
+                limits[args.method_name] = max(args.max_hits, 10)
+            by_term, search_stats = _rg_hits(clone_dir, list(limits), limits)
+    except TimeoutError as e:
+        return {
+            "error": "lock_timeout",
+            "repo_url": repo_url_display,
+            "branch": selected,
+            "detail": str(e),
+            "locks": locks.report(),
+        }
     hits = []
     for t in terms:
-        hits.extend(_rg_hits(clone_dir, t, max_count=args.max_hits))
+        hits.extend(_per_file(by_term[t], args.max_hits))
 
     # upstream/downstream candidates are heuristic: list files containing method name
-    call_chain_candidates = []
-    if args.method_name:
-        call_chain_candidates = _rg_hits(clone_dir, args.method_name, max_count=10)
+    call_chain_candidates = by_term.get(args.method_name, []) if args.method_name else []
 
-    output = {
-        "module": args.module,
+    return {
+        "module": module,
         "repo_path": repo_path,
         "repo_url": repo_url_display,
         "branch_candidates": candidates,
         "selected_branch": selected,
+        "heads_cache": heads_info,
         "clone_path": str(clone_dir),
+        "repo_cache": repo_cache,
         "search_terms": terms,
         "hits": hits[: args.max_hits * max(1, len(terms))],
+        "search_stats": search_stats,
+        "definitions": definitions,
+        "log_sites": log_sites,
+        "symbol_index": index_stats,
         "call_chain_candidates": call_chain_candidates,
+        "call_chains": call_chains,
+        "locks": locks.report(),
+    }
+
+
+def _repo_score(result):
+    """Hit density of one repository's result.
+
+    Log-template and definition matches from the symbol index weigh most; grep
+    hits count by term coverage and by how many terms co-occur in a single file
+    (an exception string's words clustering in one file beats scattered matches)."""
+    terms = result.get("search_terms") or []
+    per_file = {}
+    for h in result.get("hits", []):
+        per_file.setdefault(h["file"], set()).add(h["term"])
+    matched = {h["term"] for h in result.get("hits", [])}
+    best_file, best_terms = "", set()
+    for path, found in per_file.items():
+        if len(found) > len(best_terms):
+            best_file, best_terms = path, found
+    coverage = len(matched) / len(terms) if terms else 0
+    density = len(best_terms) / len(terms) if terms else 0
+    score = 3 * min(len(result.get("log_sites", [])), 3) + 2 * min(len(result.get("definitions", [])), 3)
+    score += coverage + 2 * density
+    return round(score, 3), {
+        "terms_matched": len(matched),
+        "best_file": best_file,
+        "best_file_terms": len(best_terms),
     }
 
+
+def locate_auto(args, workdir: Path):
+    """Search every REPO_MAP repository in parallel and rank them by hit density.
+
+    Each repo resolves its own branch via ls-remote, since release branch names
+    differ between repositories. `--cached-only` limits the search to repos that
+    already have a worktree and searches those as they are, with no network
+    access at all."""
+    repos = {}
+    for module, repo_path in REPO_MAP.items():
+        repos.setdefault(repo_path, module)
+    if args.cached_only:
+        repos = {
+            path: module
+            for path, module in repos.items()
+            if (workdir / "worktrees" / path.replace("/", "_")).is_dir()
+        }
+
+    def run(item):
+        repo_path, module = item
+        start = time.monotonic()
+        try:
+            result = locate(module, repo_path, args, workdir, list_branches=True)
+        except Exception as e:
+            result = {"error": "search_failed", "detail": str(e)}
+        result["elapsed_ms"] = int((time.monotonic() - start) * 1000)
+        return repo_path, module, result
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        results = list(executor.map(run, repos.items()))
+
+    ranking = []
+    best = None
+    for repo_path, module, result in results:
+        entry = {"module": module, "repo_path": repo_path, "elapsed_ms": result["elapsed_ms"]}
+        if "error" in result:
+            entry.update(score=0, error=result["error"], detail=result.get("detail", ""))
+        else:
+            score, detail = _repo_score(result)
+            entry.update(
+                score=score,
+                branch=result["selected_branch"],
+                log_sites=len(result["log_sites"]),
+                definitions=len(result["definitions"]),
+                hits=len(result["hits"]),
+                **detail,
+            )
+            if score > 0 and (best is None or score > best[0]):
+                best = (score, result)
+        ranking.append(entry)
+    ranking.sort(key=lambda e: -e["score"])
+
+    output = dict(best[1]) if best else {"module": "auto", "hits": [], "definitions": [], "log_sites": []}
+    output.update(
+        {
+            "requested_module": "auto",
+            "selected_module": best[1]["module"] if best else "",
+            "repo_ranking": ranking,
+            "auto_search": {
+                "repos": len(repos),
+                "workers": max(1, args.workers),
+                "elapsed_ms": int((time.monotonic() - start) * 1000),
+            },
+        }
+    )
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Locate code by module and error keywords")
+    parser.add_argument("--module", required=True, help='REPO_MAP module name, or "auto" to search all repos')
+    parser.add_argument("--product", default="")
+    parser.add_argument("--version", default="")
+    parser.add_argument("--query", default="", help="error text or keywords")
+    parser.add_argument("--class", dest="class_name", default="")
+    parser.add_argument("--method", dest="method_name", default="")
+    parser.add_argument("--base-url", default=os.environ.get("GIT_BASE_URL", DEFAULT_BASE))
+    parser.add_argument("--workdir", default=os.environ.get("CODE_WORKDIR", "/tmp/onepro-code"))
+    parser.add_argument("--list-branches", action="store_true")
+    parser.add_argument(
+        "--heads-ttl",
+        type=float,
+        default=float(os.environ.get("GIT_HEADS_TTL", DEFAULT_TTL)),
+        help="seconds a cached branch listing is reused",
+    )
+    parser.add_argument("--refresh-heads", action="store_true", help="re-list remote branches, ignoring the cache")
+    parser.add_argument("--max-hits", type=int, default=5)
+    parser.add_argument("--no-index", action="store_true", help="skip the per-commit symbol index")
+    parser.add_argument("--chain-depth", type=int, default=2, help="call chain hops (max 2)")
+    parser.add_argument("--context", type=int, default=2, help="source lines around definitions/log sites")
+    parser.add_argument(
+        "--partial",
+        choices=["auto", "on", "off"],
+        default=os.environ.get("CODE_PARTIAL_CLONE", "auto"),
+        help="blob-less mirror (--filter=blob:none); auto = on for large repos",
+    )
+    parser.add_argument(
+        "--sparse",
+        default=os.environ.get("CODE_SPARSE", "auto"),
+        help="sparse worktree languages: auto (large repos only), all, off, or e.g. python,go",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("CODE_SEARCH_WORKERS", "4")),
+        help="parallel repositories for --module auto",
+    )
+    parser.add_argument(
+        "--cached-only",
+        action="store_true",
+        help="search existing worktrees only: no ls-remote, fetch or checkout (with auto: only repos checked out before)",
+    )
+    parser.add_argument(
+        "--version-matrix",
+        action="store_true",
+        help="git grep the hit terms across release branches (version x term matrix)",
+    )
+    parser.add_argument("--matrix-max", type=int, default=6, help="newest release branches in the matrix")
+    parser.add_argument(
+        "--lock-timeout",
+        type=float,
+        default=float(os.environ.get("CODE_LOCK_TIMEOUT", "600")),
+        help="seconds to wait for a repo lock held by another run",
+    )
+    args = parser.parse_args()
+
+    user = os.environ.get("GIT_USER", "")
+    password = os.environ.get("GIT_PASS", "")
+    os.environ.update(_git_auth_env(args.base_url, user, password))
+    workdir = Path(args.workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    module_key = _normalize_module(args.module)
+    if module_key == "auto":
+        output = locate_auto(args, workdir)
+        if args.version_matrix and output.get("repo_path"):
+            output["version_matrix"] = _version_matrix(output, args, output["repo_path"])
+        print(json.dumps(output, ensure_ascii=False, indent=2))
+        return
+    if module_key not in REPO_MAP:
+        print(json.dumps({"error": "unknown module", "module": args.module}, ensure_ascii=False))
+        sys.exit(1)
+
+    output = locate(args.module, REPO_MAP[module_key], args, workdir, args.list_branches)
+    if "error" in output:
+        print(json.dumps(output, ensure_ascii=False))
+        sys.exit(1)
+    if args.version_matrix:
+        output["version_matrix"] = _version_matrix(output, args, REPO_MAP[module_key])
     print(json.dumps(output, ensure_ascii=False, indent=2))
 
 
@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+import argparse
+import gzip
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from zoneinfo import ZoneInfo
+
+MODULES = ["newmuse", "owl", "crab", "ant", "porter", "hamal", "s3block", "storplus", "proxy", "minitgt"]
+STAGES = ["安装", "注册", "初始同步", "增量同步", "演练", "接管"]
+ERRORS = [
+    "timeout connecting to {ip}:{port}",
+    "SnapshotSyncError: delta upload failed",
+    "Permission denied while attaching volume",
+    "NullPointerException in SessionManager.open",
+    "cloud API quota exceeded (rate limit)",
+    "增量同步失败，快照链断开",
+    "驱动加载失败 virtio",
+    "connection refused by proxy {ip}",
+    "authentication failed for agent",
+    "disk full on cache volume",
+]
+RESOLUTIONS = ["Fixed", "Won't Fix", "Duplicate", "Cannot Reproduce", None]
+DEFAULT_TIME_ZONE = "Asia/Shanghai"
+VERSIONS = ["v3.1.0", "v3.1.5", "v3.2.0", "v3.2.1", "v3.3.0", "v3.4.0"]
+TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*"|\(|\)|,|>=|<=|!=|~|=|>|<|[^\s(),"~=<>!]+')
+
+
+def generate_corpus(projects=("REQ", "PRJ"), per_project=500, seed=7):
+    rng = random.Random(seed)
+    base = datetime(2024, 1, 1, 8, 0, 0)
+    issues = []
+    for project in projects:
+        for n in range(1, per_project + 1):
+            module = rng.choice(MODULES)
+            stage = rng.choice(STAGES)
+            error = rng.choice(ERRORS).format(ip=f"10.0.{rng.randint(0, 9)}.{rng.randint(1, 254)}", port=rng.choice([443, 8080, 9000]))
+            updated = base + timedelta(minutes=rng.randint(0, 60 * 24 * 600))
+            resolution = rng.choice(RESOLUTIONS)
+            fix_versions = []
+            if resolution == "Fixed":
+                name = rng.choice(VERSIONS)
+                fix_versions.append({"name": name, "releaseDate": f"2025-{VERSIONS.index(name) + 1:02d}-15"})
+            comments = []
+            for c in range(rng.randint(0, 25)):
+                created = updated - timedelta(hours=rng.randint(1, 24 * 30))
+                comments.append(
+                    {
+                        "id": str(n * 100 + c),
+                        "body": rng.choice(
+                            [
+                                f"客户环境 {module} 日志已收集，{stage}阶段复现。",
+                                "Workaround: restart the agent and retry the task.",
+                                f"Fixed in {rng.choice(VERSIONS)}, please upgrade.",
+                                "Root cause: missing retry on transient network error.",
+                            ]
+                        )
+                        + " " + "log line " * rng.randint(5, 60),
+                        "created": created.strftime("%Y-%m-%dT%H:%M:%S.000+0800"),
+                    }
+                )
+            comments.sort(key=lambda c: c["created"])
+            issues.append(
+                {
+                    "key": f"{project}-{n}",
+                    "fields": {
+                        "summary": f"[{module}] {stage} {error}",
+                        "description": f"{module} 在{stage}阶段报错: {error}\n" + "stack frame at worker.py " * rng.randint(10, 200),
+                        "resolution": {"name": resolution} if resolution else None,
+                        "fixVersions": fix_versions,
+                        "status": {"name": "Done" if resolution else rng.choice(["Open", "In Progress"])},
+                        "priority": {"name": rng.choice(["P1", "P2", "P3"])},
+                        "components": [{"name": module}],
+                        "labels": rng.sample(["bug", "customer", "escalation", module], 2),
+                        "updated": updated.strftime("%Y-%m-%dT%H:%M:%S.000+0800"),
+                        "comment": {"comments": comments, "total": len(comments), "maxResults": len(comments), "startAt": 0},
+                        "issuetype": {"name": rng.choice(["Bug", "Bug", "Task", "Story"])},
+                    },
+                }
+            )
+    return issues
+
+
+def _tokens(jql):
+    return TOKEN_RE.findall(jql)
+
+
+def _unquote(tok):
+    if tok.startswith('"'):
+        return tok[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return tok
+
+
+def _issue_text(issue):
+    fields = issue["fields"]
+    comments = " ".join(c.get("body", "") for c in (fields.get("comment") or {}).get("comments", []))
+    return " ".join([fields.get("summary") or "", fields.get("description") or "", comments]).lower()
+
+
+def _jql_date(value, tz):
+    # JQL dates are wall-clock times in the searching user's timezone
+    for fmt in ("%Y/%m/%d %H:%M", "%Y-%m-%d %H:%M", "%Y/%m/%d", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt).replace(tzinfo=tz)
+        except ValueError:
+            continue
+    raise ValueError(f"bad date: {value}")
+
+
+def _issue_date(value):
+    for fmt in ("%Y-%m-%dT%H:%M:%S.%f%z", "%Y-%m-%dT%H:%M:%S%z"):
+        try:
+            return datetime.strptime(value, fmt).replace(second=0, microsecond=0)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+class JqlParser:
+    # Subset: AND/OR/NOT with parentheses; project/key/issuetype/status = | in (...);
+    # text/summary/description ~ "term"; updated >= | <= | > | < "date"; ORDER BY field [ASC|DESC]
+
+    def __init__(self, jql, tz=None):
+        self.tz = tz or ZoneInfo(DEFAULT_TIME_ZONE)
+        upper = jql.upper()
+        idx = upper.rfind(" ORDER BY ")
+        if idx < 0 and upper.startswith("ORDER BY "):
+            idx = 0
+        self.order = ("updated", True)
+        if idx >= 0:
+            order = jql[idx:].split()[2:]
+            if order:
+                self.order = (order[0], not (len(order) > 1 and order[1].upper() == "ASC"))
+            jql = jql[:idx]
+        self.toks = _tokens(jql)
+        self.pos = 0
+
+    def _peek(self):
+        return self.toks[self.pos] if self.pos < len(self.toks) else None
+
+    def _next(self):
+        tok = self._peek()
+        self.pos += 1
+        return tok
+
+    def parse(self):
+        if not self.toks:
+            return lambda issue: True
+        expr = self._or()
+        if self._peek() is not None:
+            raise ValueError(f"unexpected token {self._peek()!r}")
+        return expr
+
+    def _or(self):
+        left = self._and()
+        while (self._peek() or "").upper() == "OR":
+            self._next()
+            right = self._and()
+            left = (lambda a, b: lambda i: a(i) or b(i))(left, right)
+        return left
+
+    def _and(self):
+        left = self._not()
+        while (self._peek() or "").upper() == "AND":
+            self._next()
+            right = self._not()
+            left = (lambda a, b: lambda i: a(i) and b(i))(left, right)
+        return left
+
+    def _not(self):
+        if (self._peek() or "").upper() == "NOT":
+            self._next()
+            inner = self._not()
+            return lambda i: not inner(i)
+        if self._peek() == "(":
+            self._next()
+            expr = self._or()
+            if self._next() != ")":
+                raise ValueError("missing )")
+            return expr
+        return self._clause()
+
+    def _clause(self):
+        field = (self._next() or "").lower()
+        op = (self._next() or "").lower()
+        if op == "in":
+            if self._next() != "(":
+                raise ValueError("expected ( after in")
+            values = []
+            while self._peek() not in (")", None):
+                tok = self._next()
+                if tok != ",":
+                    values.append(_unquote(tok).lower())
+            self._next()
+            return self._match_in(field, set(values))
+        value = _unquote(self._next() or "")
+        if op == "~":
+            term = value.lower()
+            if field == "text":
+                return lambda i: term in _issue_text(i)
+            return lambda i: term in str(i["fields"].get(field) or "").lower()
+        if op in ("=", "!="):
+            match = self._match_in(field, {value.lower()})
+            return match if op == "=" else (lambda i: not match(i))
+        if op in (">=", "<=", ">", "<") and field in ("updated", "created"):
+            bound = _jql_date(value, self.tz)
+            cmp = {
+                ">=": lambda a: a >= bound,
+                "<=": lambda a: a <= bound,
+                ">": lambda a: a > bound,
+                "<": lambda a: a < bound,
+            }[op]
+
+            def match(i):
+                stamp = _issue_date(i["fields"].get(field))
+                return stamp is not None and cmp(stamp)
+
+            return match
+        raise ValueError(f"unsupported clause: {field} {op}")
+
+    @staticmethod
+    def _match_in(field, values):
+        if field == "project":
+            return lambda i: i["key"].split("-", 1)[0].lower() in values
+        if field in ("key", "issuekey"):
+            return lambda i: i["key"].lower() in values
+        if field in ("issuetype", "status", "priority", "resolution"):
+            return lambda i: ((i["fields"].get(field) or {}).get("name") or "").lower() in values
+        raise ValueError(f"unsupported field: {field}")
+
+
+class FakeJira:
+    def __init__(
+        self,
+        issues,
+        latency_ms=0,
+        jitter_ms=0,
+        throttle_every=0,
+        retry_after=1,
+        page_cap=100,
+        gzip_min=512,
+        time_zone=None,
+    ):
+        self.issues = issues
+        self.time_zone = time_zone or DEFAULT_TIME_ZONE
+        self.by_key = {i["key"].upper(): i for i in issues}
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.page_cap = page_cap
+        self.gzip_min = gzip_min
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "throttled": 0, "searches": 0, "comment_calls": 0, "version_calls": 0}
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def should_throttle(self):
+        n = next(self._counter)
+        return bool(self.throttle_every) and n % self.throttle_every == 0
+
+    def delay(self):
+        ms = self.latency_ms + (random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if ms > 0:
+            time.sleep(ms / 1000.0)
+
+    def search(self, jql, start_at=0, max_results=50, fields=None):
+        parser = JqlParser(jql or "", ZoneInfo(self.time_zone))
+        match = parser.parse()
+        field, desc = parser.order
+        hits = [i for i in self.issues if match(i)]
+        if field.lower() in ("key", "issuekey"):
+            hits.sort(key=lambda i: (i["key"].split("-")[0], int(i["key"].split("-")[1])), reverse=desc)
+        else:
+            hits.sort(key=lambda i: i["fields"].get(field) or "", reverse=desc)
+        max_results = max(0, min(int(max_results), self.page_cap))
+        page = hits[start_at : start_at + max_results]
+        wanted = set(fields or []) or None
+        return {
+            "startAt": start_at,
+            "maxResults": max_results,
+            "total": len(hits),
+            "issues": [
+                {"key": i["key"], "fields": {k: v for k, v in i["fields"].items() if wanted is None or k in wanted}}
+                for i in page
+            ],
+        }
+
+    def comments(self, key, start_at=0, max_results=50, order_by=""):
+        issue = self.by_key.get(key.upper())
+        if issue is None:
+            return None
+        comments = list((issue["fields"].get("comment") or {}).get("comments", []))
+        comments.sort(key=lambda c: c.get("created", ""), reverse=order_by.startswith("-"))
+        page = comments[start_at : start_at + max_results]
+        return {"startAt": start_at, "maxResults": max_results, "total": len(comments), "comments": page}
+
+    def myself(self):
+        return {"name": "fake", "displayName": "Fake User", "timeZone": self.time_zone}
+
+    def versions(self, project):
+        prefix = project.upper() + "-"
+        if not any(key.startswith(prefix) for key in self.by_key):
+            return None
+        names = {}
+        for issue in self.issues:
+            if issue["key"].startswith(prefix):
+                for v in issue["fields"].get("fixVersions") or []:
+                    names[v["name"]] = v.get("releaseDate")
+        ordered = [n for n in VERSIONS if n in names] + sorted(n for n in names if n not in VERSIONS)
+        return [
+            {"id": str(i + 1), "name": n, "released": bool(names[n]), "archived": False, "releaseDate": names[n]}
+            for i, n in enumerate(ordered)
+        ]
+
+
+def make_handler(jira):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, obj, headers=None):
+            body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            if "gzip" in (self.headers.get("Accept-Encoding") or "") and len(body) >= jira.gzip_min:
+                body = gzip.compress(body)
+                self.send_header("Content-Encoding", "gzip")
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.send_header("Content-Type", "application/json;charset=UTF-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _begin(self):
+            jira.count("requests")
+            jira.delay()
+            if jira.should_throttle():
+                jira.count("throttled")
+                self._send(429, {"errorMessages": ["Rate limit exceeded"]}, {"Retry-After": str(jira.retry_after)})
+                return False
+            return True
+
+        def _search(self, payload):
+            jira.count("searches")
+            try:
+                result = jira.search(
+                    payload.get("jql", ""),
+                    int(payload.get("startAt", 0) or 0),
+                    int(payload.get("maxResults", 50) or 50),
+                    payload.get("fields"),
+                )
+            except ValueError as e:
+                self._send(400, {"errorMessages": [f"Error in the JQL Query: {e}"]})
+                return
+            self._send(200, result)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b"{}"
+            if not self._begin():
+                return
+            if urllib.parse.urlparse(self.path).path != "/rest/api/2/search":
+                self._send(404, {"errorMessages": ["not found"]})
+                return
+            try:
+                payload = json.loads(raw.decode("utf-8") or "{}")
+            except ValueError:
+                self._send(400, {"errorMessages": ["invalid JSON"]})
+                return
+            self._search(payload)
+
+        def do_GET(self):
+            if not self._begin():
+                return
+            url = urllib.parse.urlparse(self.path)
+            query = dict(urllib.parse.parse_qsl(url.query))
+            if url.path == "/rest/api/2/search":
+                fields = [f for f in query.get("fields", "").split(",") if f] or None
+                self._search({"jql": query.get("jql", ""), "startAt": query.get("startAt", 0), "maxResults": query.get("maxResults", 50), "fields": fields})
+                return
+            if url.path == "/rest/api/2/myself":
+                self._send(200, jira.myself())
+                return
+            m = re.match(r"^/rest/api/2/issue/([^/]+)/comment$", url.path)
+            if m:
+                jira.count("comment_calls")
+                result = jira.comments(
+                    urllib.parse.unquote(m.group(1)),
+                    int(query.get("startAt", 0)),
+                    int(query.get("maxResults", 50)),
+                    query.get("orderBy", ""),
+                )
+                if result is None:
+                    self._send(404, {"errorMessages": ["Issue Does Not Exist"]})
+                else:
+                    self._send(200, result)
+                return
+            m = re.match(r"^/rest/api/2/project/([^/]+)/versions$", url.path)
+            if m:
+                jira.count("version_calls")
+                result = jira.versions(urllib.parse.unquote(m.group(1)))
+                if result is None:
+                    self._send(404, {"errorMessages": ["No project could be found"]})
+                else:
+                    self._send(200, result)
+                return
+            self._send(404, {"errorMessages": ["not found"]})
+
+    return Handler
+
+
+def make_server(jira, host="127.0.0.1", port=0):
+    server = ThreadingHTTPServer((host, port), make_handler(jira))
+    server.daemon_threads = True
+    return server
+
+
+def start_background(jira, host="127.0.0.1", port=0):
+    server = make_server(jira, host, port)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def load_issues(args):
+    if args.fixtures:
+        with open(args.fixtures, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data.get("issues", data) if isinstance(data, dict) else data
+    projects = [p.strip() for p in args.projects.split(",") if p.strip()]
+    return generate_corpus(projects, per_project=args.issues, seed=args.seed)
+
+
+def add_server_args(parser):
+    parser.add_argument("--fixtures", default="", help="JSON file with a list of {key, fields} issues")
+    parser.add_argument("--projects", default="REQ,PRJ")
+    parser.add_argument("--issues", type=int, default=500, help="generated issues per project")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--throttle-every", type=int, default=0, help="answer every Nth request with 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--page-cap", type=int, default=100, help="server-side maxResults cap")
+    parser.add_argument("--time-zone", default=DEFAULT_TIME_ZONE, help="user timezone JQL dates are read in")
+
+
+def build_fake(args):
+    return FakeJira(
+        load_issues(args),
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        throttle_every=args.throttle_every,
+        retry_after=args.retry_after,
+        page_cap=args.page_cap,
+        time_zone=args.time_zone,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Jira REST server for testing and benchmarking jira_search.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    add_server_args(parser)
+    args = parser.parse_args()
+
+    jira = build_fake(args)
+    server = make_server(jira, args.host, args.port)
+    print(
+        json.dumps(
+            {"base_url": f"http://{args.host}:{server.server_address[1]}", "issues": len(jira.issues)},
+            ensure_ascii=False,
+        ),
+        flush=True,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from jira_search import DEFAULT_FIELDS, JiraClient, _mirror_path, mirror_set_meta, mirror_upsert, open_mirror
+
+
+def _parse_updated(value):
+    # Jira returns 2025-01-01T08:00:00.000+0800
+    for fmt in ("%Y-%m-%dT%H:%M:%S.%f%z", "%Y-%m-%dT%H:%M:%S%z"):
+        try:
+            return datetime.strptime(value, fmt)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def _user_timezone(client, name=""):
+    """Timezone JQL dates are read in: `name` if given, else the sync user's
+    profile timeZone from /rest/api/2/myself; None when neither resolves."""
+    if not name:
+        try:
+            name = (client.request("GET", "/rest/api/2/myself") or {}).get("timeZone") or ""
+        except RuntimeError:
+            return None
+    try:
+        return ZoneInfo(name) if name else None
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def _jql_watermark(updated, overlap_minutes, tz=None):
+    # JQL only accepts minute precision in the searching user's timezone, so
+    # convert the stamp there and step back a little; upserts dedupe the overlap.
+    # Without a tz the stamp's own offset is assumed to match the user's.
+    ts = _parse_updated(updated)
+    if ts is None:
+        return ""
+    if tz is not None:
+        ts = ts.astimezone(tz)
+    return (ts - timedelta(minutes=overlap_minutes)).strftime("%Y/%m/%d %H:%M")
+
+
+def sync_project(client, conn, project, page_size=100, full=False, overlap_minutes=5, tz=None):
+    start = time.monotonic()
+    row = conn.execute("SELECT watermark FROM sync_state WHERE project = ?", (project,)).fetchone()
+    watermark = "" if full or not row else (row[0] or "")
+
+    jql = f"project = {project}"
+    since = _jql_watermark(watermark, overlap_minutes, tz) if watermark else ""
+    if since:
+        jql += f' AND updated >= "{since}"'
+    jql += " ORDER BY updated ASC"
+
+    fetched = 0
+    start_at = 0
+    newest = watermark
+    newest_ts = _parse_updated(watermark)
+    while True:
+        page = client.search(jql, page_size, DEFAULT_FIELDS, start_at=start_at)
+        issues = page.get("issues", []) or []
+        with conn:
+            for issue in issues:
+                mirror_upsert(conn, issue)
+                updated = (issue.get("fields") or {}).get("updated") or ""
+                ts = _parse_updated(updated)
+                if ts is not None and (newest_ts is None or ts > newest_ts):
+                    newest, newest_ts = updated, ts
+        fetched += len(issues)
+        start_at += len(issues)
+        if not issues or start_at >= int(page.get("total", 0) or 0):
+            break
+
+    total = conn.execute("SELECT COUNT(*) FROM issues WHERE project = ?", (project,)).fetchone()[0]
+    with conn:
+        conn.execute(
+            "INSERT INTO sync_state (project, watermark, synced_at, total) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(project) DO UPDATE SET watermark = excluded.watermark, "
+            "synced_at = excluded.synced_at, total = excluded.total",
+            (project, newest, datetime.now().strftime("%Y-%m-%dT%H:%M:%S"), total),
+        )
+    return {
+        "project": project,
+        "jql": jql,
+        "fetched": fetched,
+        "total": total,
+        "watermark": newest,
+        "timezone": str(tz) if tz else "",
+        "elapsed_ms": int((time.monotonic() - start) * 1000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mirror Jira projects into a local SQLite/FTS5 database")
+    parser.add_argument("--base-url", default=os.environ.get("JIRA_BASE_URL", ""))
+    parser.add_argument("--project-keys", default=os.environ.get("JIRA_PROJECT_KEYS", "REQ,PRJ"))
+    parser.add_argument("--db", default="", help="mirror database path (default $JIRA_MIRROR_DB)")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument(
+        "--overlap-minutes",
+        type=int,
+        default=int(os.environ.get("JIRA_SYNC_OVERLAP_MINUTES", "5")),
+        help="re-fetch this many minutes before the watermark",
+    )
+    parser.add_argument(
+        "--timezone",
+        default=os.environ.get("JIRA_TIMEZONE", ""),
+        help="timezone JQL dates are read in (default: the sync user's profile timeZone)",
+    )
+    parser.add_argument("--full", action="store_true", help="ignore the watermark and resync everything")
+    parser.add_argument("--rate", type=float, default=float(os.environ.get("JIRA_RATE_LIMIT", "0")), help="max requests/s, 0 = unlimited")
+    args = parser.parse_args()
+
+    if not args.base_url:
+        print(json.dumps({"error": "missing base url"}, ensure_ascii=False))
+        sys.exit(1)
+    user = os.environ.get("JIRA_USER", "")
+    password = os.environ.get("JIRA_PASS", "")
+    if not user or not password:
+        print(json.dumps({"error": "missing JIRA_USER/JIRA_PASS"}, ensure_ascii=False))
+        sys.exit(1)
+
+    db_path = args.db or _mirror_path()
+    project_keys = [k.strip() for k in args.project_keys.split(",") if k.strip()]
+    client = JiraClient(args.base_url, user, password, rate=args.rate)
+    conn = open_mirror(db_path)
+    with conn:
+        mirror_set_meta(conn, "base_url", args.base_url.rstrip("/"))
+    tz = _user_timezone(client, args.timezone)
+    projects = []
+    try:
+        for project in project_keys:
+            projects.append(
+                sync_project(
+                    client,
+                    conn,
+                    project,
+                    page_size=args.page_size,
+                    full=args.full,
+                    overlap_minutes=args.overlap_minutes,
+                    tz=tz,
+                )
+            )
+    except RuntimeError as e:
+        print(json.dumps({"error": "sync_failed", "detail": str(e), "db": db_path, "projects": projects}, ensure_ascii=False))
+        sys.exit(1)
+    finally:
+        client.close()
+        conn.close()
+
+    print(json.dumps({"db": db_path, "projects": projects, "http": client.stats}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,556 @@
+#!/usr/bin/env python3
+import argparse
+import ast
+import bisect
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+INDEX_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS commits (
+        id INTEGER PRIMARY KEY,
+        sha TEXT UNIQUE NOT NULL,
+        base_sha TEXT,
+        indexed_at TEXT,
+        files INTEGER
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS files (
+        commit_id INTEGER NOT NULL,
+        path TEXT NOT NULL,
+        blob TEXT NOT NULL,
+        PRIMARY KEY (commit_id, path)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS files_blob ON files (blob)",
+    "CREATE TABLE IF NOT EXISTS blobs (blob TEXT PRIMARY KEY, lang TEXT, error TEXT) WITHOUT ROWID",
+    """
+    CREATE TABLE IF NOT EXISTS symbols (
+        blob TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        name TEXT NOT NULL,
+        parent TEXT,
+        line INTEGER,
+        end_line INTEGER
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS symbols_name ON symbols (name COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS symbols_blob ON symbols (blob)",
+    """
+    CREATE TABLE IF NOT EXISTS calls (
+        blob TEXT NOT NULL,
+        caller TEXT NOT NULL,
+        caller_parent TEXT,
+        callee TEXT NOT NULL,
+        line INTEGER
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS calls_blob_caller ON calls (blob, caller)",
+    "CREATE INDEX IF NOT EXISTS calls_callee ON calls (callee)",
+]
+# bump when parsers change what they store; older indexes are rebuilt
+INDEX_VERSION = 2
+
+LANG_EXTS = {".py": "python", ".go": "go", ".java": "java", ".cs": "csharp"}
+LOG_METHODS = {"debug", "info", "warning", "warn", "error", "exception", "critical", "fatal"}
+MAX_FILE_BYTES = 2 * 1024 * 1024
+MAX_LOG_CHARS = 300
+
+# brace languages: regex heuristics, good enough to find definitions and their extent
+STRING_RE = re.compile(r'"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'|`[^`]*`')
+LINE_COMMENT_RE = re.compile(r"//.*$")
+GO_FUNC_RE = re.compile(r"^func\s+(?:\(\s*\w*\s*\*?\s*(\w+)[^)]*\)\s*)?(\w+)\s*[\[(]")
+GO_TYPE_RE = re.compile(r"^type\s+(\w+)\s+(struct|interface)\b")
+TYPE_RE = re.compile(r"\b(class|interface|enum|record|struct)\s+(\w+)")
+METHOD_RE = re.compile(
+    r"^\s*(?:@\w+(?:\([^)]*\))?\s+)*(?:(?:public|private|protected|internal|static|final|abstract|synchronized|"
+    r"native|override|virtual|async|sealed|extern|unsafe|new|partial|default|readonly)\s+)*"
+    r"(?:<[^>]+>\s+)?[\w<>\[\],.?]+(?:\s*<[^>]*>)?\s+(\w+)\s*\([^;]*$"
+)
+CTOR_RE = re.compile(r"^\s*(?:(?:public|private|protected|internal)\s+)(\w+)\s*\([^;]*$")
+CALL_RE = re.compile(r"\b([A-Za-z_]\w*)\s*\(")
+NOT_CALLS = {"func", "sizeof", "typeof", "nameof", "super", "this", "make", "len", "append", "new", "return", "instanceof"}
+NOT_METHODS = {"if", "for", "while", "switch", "catch", "return", "new", "else", "using", "lock", "foreach", "throw", "await", "yield"}
+BRACE_LOG_LEVELS = LOG_METHODS | {"print", "println", "trace", "warnln", "errorln"}
+BRACE_LOG_RE = re.compile(
+    r"\b(?:log|logger|LOG|LOGGER|_logger|_log|Log|Logger|klog|glog|zap\.\w+\(\)|logrus)\s*\.\s*"
+    r"(?:\w+\.)*(\w+?)f?\s*\(\s*(?:[\w.]+\s*,\s*)?\"((?:[^\"\\]|\\.)*)\""
+)
+FORMAT_RE = re.compile(r"%[-+ #0-9.]*[a-zA-Z]|\{[^{}]*\}")
+
+
+def _git(args, cwd):
+    return subprocess.check_output(["git"] + args, cwd=cwd, stderr=subprocess.DEVNULL, text=True)
+
+
+def open_index(db_path):
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+        with conn:
+            for table in ("commits", "files", "blobs", "symbols", "calls"):
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+    for stmt in INDEX_SCHEMA:
+        conn.execute(stmt)
+    return conn
+
+
+def _lang(path):
+    return LANG_EXTS.get(os.path.splitext(path)[1].lower())
+
+
+def _log_text(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.JoinedStr):
+        return "".join(v.value if isinstance(v, ast.Constant) else "{}" for v in node.values)
+    return None
+
+
+def parse_python(source):
+    """Returns (symbols, calls); calls are (caller, caller_parent, callee, line)."""
+    tree = ast.parse(source)
+    symbols = []
+    calls = []
+
+    def visit(node, parent, in_class, func):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.ClassDef):
+                symbols.append(("class", child.name, parent, child.lineno, child.end_lineno))
+                visit(child, child.name, True, None)
+            elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                kind = "method" if in_class else "function"
+                symbols.append((kind, child.name, parent, child.lineno, child.end_lineno))
+                visit(child, child.name, False, (child.name, parent))
+            else:
+                if isinstance(child, ast.Call):
+                    target = child.func
+                    callee = target.id if isinstance(target, ast.Name) else getattr(target, "attr", None)
+                    if callee and func:
+                        calls.append((func[0], func[1], callee, child.lineno))
+                    if isinstance(target, ast.Attribute) and child.args and target.attr in LOG_METHODS:
+                        text = _log_text(child.args[0])
+                        if text and text.strip():
+                            symbols.append(("log", text[:MAX_LOG_CHARS], parent, child.lineno, child.end_lineno))
+                visit(child, parent, in_class, func)
+
+    visit(tree, None, False, None)
+    return symbols, calls
+
+
+def _brace_spans(lines):
+    # returns (sorted lines opening a brace, line -> line where its outermost brace closes)
+    stack = []
+    first_open = {}
+    for lineno, line in enumerate(lines, 1):
+        code = LINE_COMMENT_RE.sub("", STRING_RE.sub('""', line))
+        for ch in code:
+            if ch == "{":
+                stack.append(lineno)
+            elif ch == "}" and stack:
+                opened = stack.pop()
+                # outer braces close last, so they overwrite inner ones opened on the same line
+                first_open[opened] = lineno
+    opens = sorted(first_open)
+    return opens, first_open
+
+
+def _extent(opens, spans, line):
+    idx = bisect.bisect_left(opens, line)
+    if idx < len(opens) and opens[idx] <= line + 3:
+        return spans[opens[idx]]
+    return line
+
+
+def parse_braces(source, lang):
+    lines = source.splitlines()
+    opens, spans = _brace_spans(lines)
+    types = []
+    symbols = []
+    for lineno, line in enumerate(lines, 1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith(("//", "*", "/*")):
+            continue
+        if lang == "go":
+            m = GO_TYPE_RE.match(stripped)
+            if m:
+                end = _extent(opens, spans, lineno)
+                symbols.append(("class", m.group(1), None, lineno, end))
+                continue
+            m = GO_FUNC_RE.match(stripped)
+            if m:
+                receiver, name = m.group(1), m.group(2)
+                symbols.append(("method" if receiver else "function", name, receiver, lineno, _extent(opens, spans, lineno)))
+                continue
+        else:
+            m = TYPE_RE.search(STRING_RE.sub('""', stripped))
+            if m and not stripped.startswith(("return", "new ")) and "(" not in stripped.split(m.group(0))[0]:
+                end = _extent(opens, spans, lineno)
+                parent = next((t[0] for t in reversed(types) if t[1] <= lineno <= t[2]), None)
+                types.append((m.group(2), lineno, end))
+                symbols.append(("class", m.group(2), parent, lineno, end))
+                continue
+            # ignore one-line bodies: "int size() { return 1; }"
+            head = STRING_RE.sub('""', line).split("{", 1)[0]
+            m = METHOD_RE.match(head) or CTOR_RE.match(head)
+            if m and m.group(1) not in NOT_METHODS and stripped.split()[0] not in NOT_METHODS:
+                parent = next((t[0] for t in reversed(types) if t[1] <= lineno <= t[2]), None)
+                symbols.append(("method", m.group(1), parent, lineno, _extent(opens, spans, lineno)))
+                continue
+        for m in BRACE_LOG_RE.finditer(line):
+            level = m.group(1).lower()
+            # Microsoft.Extensions.Logging style: LogError / LogWarning
+            if level.startswith("log") and level[3:] in BRACE_LOG_LEVELS:
+                level = level[3:]
+            if level in BRACE_LOG_LEVELS:
+                symbols.append(("log", m.group(2)[:MAX_LOG_CHARS], None, lineno, lineno))
+    # innermost enclosing function per line: log owners and call-graph callers
+    funcs = [s for s in symbols if s[0] in ("method", "function")]
+    owner = {}
+    for f in sorted(funcs, key=lambda f: (f[3], -f[4])):
+        for line in range(f[3], f[4] + 1):
+            owner[line] = f
+    resolved = []
+    for kind, name, parent, line, end in symbols:
+        if kind == "log":
+            f = owner.get(line)
+            resolved.append((kind, name, f[1] if f else None, line, end))
+        else:
+            resolved.append((kind, name, parent, line, end))
+    calls = []
+    for line, f in owner.items():
+        if line == f[3]:
+            continue
+        code = LINE_COMMENT_RE.sub("", STRING_RE.sub('""', lines[line - 1]))
+        for m in CALL_RE.finditer(code):
+            callee = m.group(1)
+            if callee not in NOT_CALLS and callee not in NOT_METHODS:
+                calls.append((f[1], f[2], callee, line))
+    return resolved, calls
+
+
+def parse_source(raw, lang):
+    """Returns (symbols, calls) for a file's raw bytes."""
+    if len(raw) > MAX_FILE_BYTES:
+        raise ValueError("file too large")
+    source = raw.decode("utf-8", errors="replace")
+    if lang == "python":
+        return parse_python(source)
+    return parse_braces(source, lang)
+
+
+def _ls_tree(repo_dir, commit, paths=None):
+    args = ["ls-tree", "-r", "-z", commit]
+    if paths is not None:
+        args += ["--"] + list(paths)
+    entries = {}
+    for record in _git(args, repo_dir).split("\0"):
+        if not record:
+            continue
+        meta, path = record.split("\t", 1)
+        mode, kind, blob = meta.split()
+        if kind == "blob" and _lang(path):
+            entries[path] = blob
+    return entries
+
+
+class SymbolIndex:
+    """Per-commit symbol index of a checked-out repository.
+
+    Definitions are stored once per file blob; each indexed commit only maps
+    paths to blobs. A new commit starts from the most recently indexed one and
+    re-lists just the paths reported by `git diff --name-only`, so only
+    changed files are parsed.
+
+    With `materialized_only` (sparse checkouts of partial clones) only files
+    present in the worktree are indexed: reading the others would fetch their
+    blobs from the remote one at a time."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = open_index(db_path)
+
+    def close(self):
+        self.conn.close()
+
+    def commit_id(self, sha):
+        row = self.conn.execute("SELECT id FROM commits WHERE sha = ?", (sha,)).fetchone()
+        return row[0] if row else None
+
+    def _base_commit(self, repo_dir):
+        for (base,) in self.conn.execute("SELECT sha FROM commits ORDER BY id DESC LIMIT 20"):
+            try:
+                _git(["cat-file", "-e", f"{base}^{{commit}}"], repo_dir)
+            except subprocess.CalledProcessError:
+                continue
+            return base
+        return None
+
+    def update(self, repo_dir, sha, materialized_only=False):
+        start = time.monotonic()
+        stats = {"commit": sha, "base": None, "changed_files": 0, "parsed_files": 0, "errors": 0, "indexed": False}
+        if self.commit_id(sha) is not None:
+            stats["elapsed_ms"] = int((time.monotonic() - start) * 1000)
+            return stats
+        base = self._base_commit(repo_dir)
+        if base:
+            # a rename must list its old path too, or the stale entry survives
+            changed = [p for p in _git(["diff", "--name-only", "--no-renames", "-z", base, sha], repo_dir).split("\0") if p]
+            entries = {
+                path: blob
+                for path, blob in self.conn.execute(
+                    "SELECT path, blob FROM files WHERE commit_id = ?", (self.commit_id(base),)
+                )
+            }
+            for path in changed:
+                entries.pop(path, None)
+            relevant = [p for p in changed if _lang(p)]
+            # batch to keep the command line bounded
+            for i in range(0, len(relevant), 500):
+                entries.update(_ls_tree(repo_dir, sha, relevant[i : i + 500]))
+            stats.update({"base": base, "changed_files": len(changed)})
+        else:
+            entries = _ls_tree(repo_dir, sha)
+
+        head = _git(["rev-parse", "HEAD"], repo_dir).strip()
+        if materialized_only and head == sha:
+            skipped = len(entries)
+            entries = {p: b for p, b in entries.items() if os.path.isfile(os.path.join(repo_dir, p))}
+            stats["not_materialized"] = skipped - len(entries)
+
+        known = set()
+        blobs = list(set(entries.values()))
+        for i in range(0, len(blobs), 900):
+            chunk = blobs[i : i + 900]
+            marks = ",".join("?" * len(chunk))
+            known.update(b for (b,) in self.conn.execute(f"SELECT blob FROM blobs WHERE blob IN ({marks})", chunk))
+
+        with self.conn:
+            for path, blob in entries.items():
+                if blob in known:
+                    continue
+                known.add(blob)
+                lang = _lang(path)
+                error = None
+                symbols, calls = [], []
+                try:
+                    symbols, calls = parse_source(self._read_blob(repo_dir, path, blob, head == sha), lang)
+                except (OSError, SyntaxError, ValueError, subprocess.CalledProcessError) as e:
+                    error = str(e)[:200]
+                    stats["errors"] += 1
+                self.conn.execute("INSERT OR REPLACE INTO blobs (blob, lang, error) VALUES (?, ?, ?)", (blob, lang, error))
+                self.conn.executemany(
+                    "INSERT INTO symbols (blob, kind, name, parent, line, end_line) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(blob,) + tuple(s) for s in symbols],
+                )
+                self.conn.executemany(
+                    "INSERT INTO calls (blob, caller, caller_parent, callee, line) VALUES (?, ?, ?, ?, ?)",
+                    [(blob,) + tuple(c) for c in calls],
+                )
+                stats["parsed_files"] += 1
+            cur = self.conn.execute(
+                "INSERT INTO commits (sha, base_sha, indexed_at, files) VALUES (?, ?, ?, ?)",
+                (sha, base, datetime.now().strftime("%Y-%m-%dT%H:%M:%S"), len(entries)),
+            )
+            self.conn.executemany(
+                "INSERT INTO files (commit_id, path, blob) VALUES (?, ?, ?)",
+                [(cur.lastrowid, path, blob) for path, blob in entries.items()],
+            )
+        stats["indexed"] = True
+        stats["files"] = len(entries)
+        stats["elapsed_ms"] = int((time.monotonic() - start) * 1000)
+        return stats
+
+    @staticmethod
+    def _read_blob(repo_dir, path, blob, checked_out):
+        # the checkout is cheapest; fall back to the object store for other commits
+        # or files that are not materialised (sparse checkouts)
+        if checked_out:
+            try:
+                with open(os.path.join(repo_dir, path), "rb") as f:
+                    return f.read(MAX_FILE_BYTES + 1)
+            except OSError:
+                pass
+        return subprocess.check_output(["git", "cat-file", "blob", blob], cwd=repo_dir, stderr=subprocess.DEVNULL)
+
+    def lookup(self, sha, class_name="", method_name="", limit=20):
+        commit_id = self.commit_id(sha)
+        if commit_id is None or not (class_name or method_name):
+            return []
+        sql = (
+            "SELECT s.kind, s.name, s.parent, f.path, s.line, s.end_line FROM symbols s "
+            "JOIN files f ON f.blob = s.blob WHERE f.commit_id = ? AND s.kind != 'log' AND "
+        )
+        if method_name:
+            sql += "s.name = ? COLLATE NOCASE"
+            params = [commit_id, method_name]
+            if class_name:
+                sql += " AND s.parent = ? COLLATE NOCASE"
+                params.append(class_name)
+        else:
+            sql += "s.name = ? COLLATE NOCASE AND s.kind = 'class'"
+            params = [commit_id, class_name]
+        sql += " ORDER BY f.path, s.line LIMIT ?"
+        params.append(limit)
+        return [
+            {"kind": k, "name": n, "parent": p or "", "file": f, "line": l, "end_line": e}
+            for k, n, p, f, l, e in self.conn.execute(sql, params)
+        ]
+
+    def _functions(self, commit_id, name, parent=None, limit=5, blob=None):
+        sql = (
+            "SELECT s.name, s.parent, f.path, s.line, s.end_line, f.blob FROM symbols s JOIN files f ON f.blob = s.blob "
+            "WHERE f.commit_id = ? AND s.name = ? COLLATE NOCASE AND s.kind IN ('method', 'function')"
+        )
+        params = [commit_id, name]
+        if parent:
+            sql += " AND s.parent = ? COLLATE NOCASE"
+            params.append(parent)
+        if blob:
+            sql += " AND s.blob = ?"
+            params.append(blob)
+        sql += " ORDER BY f.path, s.line LIMIT ?"
+        params.append(limit)
+        return [
+            {"name": n, "parent": p or "", "file": f, "line": l, "end_line": e, "_blob": b}
+            for n, p, f, l, e, b in self.conn.execute(sql, params)
+        ]
+
+    def _callees(self, commit_id, node, limit):
+        # only callees defined in the repo: drops stdlib/framework calls
+        rows = self.conn.execute(
+            "SELECT callee, MIN(line) FROM calls WHERE blob = ? AND caller = ? AND caller_parent IS ? "
+            "GROUP BY callee ORDER BY MIN(line)",
+            (node["_blob"], node["name"], node["parent"] or None),
+        )
+        found = []
+        for callee, line in rows:
+            for target in self._resolve_callee(commit_id, node, callee):
+                found.append(dict(target, called_at=line))
+                if len(found) >= limit:
+                    return found
+        return found
+
+    def _resolve_callee(self, commit_id, node, callee, limit=2):
+        # nearest definition wins: the caller's own file and class, then the same class
+        # elsewhere (Go methods spread over a package), then the same file, and only
+        # then any function by that name
+        parent = node["parent"] or None
+        scopes = [(parent, node["_blob"]), (parent, None), (None, node["_blob"])] if parent else [(None, node["_blob"])]
+        for scope_parent, blob in scopes:
+            found = self._functions(commit_id, callee, scope_parent, limit=limit, blob=blob)
+            if found:
+                return found
+        return self._functions(commit_id, callee, limit=limit)
+
+    def _callers(self, commit_id, node, limit):
+        rows = self.conn.execute(
+            "SELECT c.caller, c.caller_parent, f.path, MIN(c.line), f.blob FROM calls c JOIN files f ON f.blob = c.blob "
+            "WHERE f.commit_id = ? AND c.callee = ? GROUP BY f.path, c.caller, c.caller_parent LIMIT ?",
+            (commit_id, node["name"], limit),
+        )
+        found = []
+        for caller, parent, path, line, blob in rows:
+            span = self.conn.execute(
+                "SELECT line, end_line FROM symbols WHERE blob = ? AND name = ? AND parent IS ? AND kind IN ('method', 'function')",
+                (blob, caller, parent),
+            ).fetchone() or (None, None)
+            found.append(
+                {"name": caller, "parent": parent or "", "file": path, "line": span[0], "end_line": span[1], "call_line": line, "_blob": blob}
+            )
+        return found
+
+    def call_chains(self, sha, class_name="", method_name="", depth=2, limit=20):
+        """Bounded upstream/downstream chains around --method from the stored call edges.
+
+        Callee names are resolved against definitions in the same commit, nearest
+        scope first (same file and class, same class, same file, anywhere), so the
+        graph is still heuristic for overloaded or commonly named methods."""
+        commit_id = self.commit_id(sha)
+        result = {"upstream": [], "downstream": []}
+        if commit_id is None or not method_name:
+            return result
+        depth = max(1, min(depth, 2))
+        for target in self._functions(commit_id, method_name, class_name or None):
+            for callee in self._callees(commit_id, target, limit):
+                result["downstream"].append([target, callee])
+                if depth > 1:
+                    for nxt in self._callees(commit_id, callee, limit):
+                        if (nxt["file"], nxt["line"]) != (target["file"], target["line"]):
+                            result["downstream"].append([target, callee, nxt])
+            for caller in self._callers(commit_id, target, limit):
+                result["upstream"].append([caller, target])
+                if depth > 1:
+                    for prev in self._callers(commit_id, caller, limit):
+                        if (prev["file"], prev["name"]) != (caller["file"], caller["name"]):
+                            result["upstream"].append([prev, caller, target])
+        for direction in result:
+            result[direction] = [[{k: v for k, v in n.items() if k != "_blob"} for n in chain] for chain in result[direction][:limit]]
+        return result
+
+    def log_sites(self, sha, text, limit=10, min_fragment=8):
+        # match log templates against an error text: the longest literal fragment of
+        # the format string (placeholders removed) must appear in the text
+        commit_id = self.commit_id(sha)
+        if commit_id is None or not text:
+            return []
+        haystack = text.lower()
+        found = []
+        rows = self.conn.execute(
+            "SELECT s.name, s.parent, f.path, s.line FROM symbols s JOIN files f ON f.blob = s.blob "
+            "WHERE f.commit_id = ? AND s.kind = 'log'",
+            (commit_id,),
+        )
+        for message, parent, path, line in rows:
+            fragment = max((p.strip() for p in FORMAT_RE.split(message)), key=len, default="")
+            if len(fragment) >= min_fragment and fragment.lower() in haystack:
+                found.append({"message": message, "function": parent or "", "file": path, "line": line, "matched": fragment})
+        found.sort(key=lambda x: len(x["matched"]), reverse=True)
+        return found[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the per-commit symbol index of a checkout")
+    parser.add_argument("--repo-dir", required=True)
+    parser.add_argument("--db", required=True)
+    parser.add_argument("--commit", default="HEAD")
+    parser.add_argument("--class", dest="class_name", default="")
+    parser.add_argument("--method", dest="method_name", default="")
+    parser.add_argument("--log-text", default="", help="error text to match against indexed log messages")
+    args = parser.parse_args()
+
+    try:
+        sha = _git(["rev-parse", args.commit], args.repo_dir).strip()
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(json.dumps({"error": "not a git checkout", "detail": str(e)}, ensure_ascii=False))
+        sys.exit(1)
+    index = SymbolIndex(args.db)
+    try:
+        stats = index.update(args.repo_dir, sha)
+        start = time.monotonic()
+        definitions = index.lookup(sha, args.class_name, args.method_name)
+        log_sites = index.log_sites(sha, args.log_text)
+        stats["lookup_ms"] = round((time.monotonic() - start) * 1000, 2)
+    finally:
+        index.close()
+    print(
+        json.dumps(
+            {"commit": sha, "index": stats, "definitions": definitions, "log_sites": log_sites},
+            ensure_ascii=False,
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 import argparse
+import hashlib
 import json
+import math
 import os
 import re
 import shutil
@@ -8,7 +10,39 @@ import subprocess
 import sys
 import tarfile
 import tempfile
+import time
 import zipfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+OCR_LANG = os.environ.get("OCR_LANG", "chi_sim+eng")
+OCR_MAX_WIDTH = 1920
+OCR_GRID = 24
+OCR_MAX_REGIONS = 8
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".webp", ".tif", ".tiff")
+ERROR_WORDS = ["error", "exception", "failed", "failure", "timeout", "错误", "失败", "异常", "超时"]
+IP_RE = re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}(?::\d{1,5})?\b")
+TIMESTAMP_RE = re.compile(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}")
+SIGNATURE_SCRUB = [
+    (TIMESTAMP_RE, ""),
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.I), "<uuid>"),
+    (IP_RE, "<ip>"),
+    (re.compile(r"\b0x[0-9a-f]+\b", re.I), "<hex>"),
+    (re.compile(r"\d+"), "<n>"),
+]
+PY_FRAME_RE = re.compile(r'File "([^"]+)", line \d+, in ([\w<>]+)')
+JVM_FRAME_RE = re.compile(r"\bat ([\w$]+(?:\.[\w$]+)+)\.([\w$<>]+)\(")
+EXCEPTION_RE = re.compile(r"\b([A-Z]\w*(?:Error|Exception|Fault))\b")
+TERM_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_.]{2,}")
+VENDOR_FRAMES = ("site-packages", "dist-packages", "/lib/python", "java.", "javax.", "sun.", "jdk.", "org.springframework.", "System.")
+TERM_STOP_WORDS = set(
+    ["error", "errors", "exception", "failed", "failure", "timeout", "traceback", "most", "recent", "call", "last",
+     "info", "debug", "warning", "warn", "trace", "critical", "fatal", "the", "and", "for", "with", "from", "not",
+     "line", "file", "none", "null", "true", "false", "self", "uuid", "hex"]
+)
+MAX_DERIVED_KEYWORDS = 5
+# bundle hashes kept in term_df.json to avoid counting a re-run twice
+MAX_COUNTED_BUNDLES = 5000
 
 
 def _run(cmd, env=None):
@@ -28,7 +62,7 @@ def _read_lines(path, max_lines=20000):
 
 def _extract_timestamp(line):
     # Match common patterns: 2025-01-01 12:34:56 or 2025-01-01T12:34:56
-    m = re.search(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}", line)
+    m = TIMESTAMP_RE.search(line)
     return m.group(0) if m else ""
 
 
@@ -50,6 +84,108 @@ def _classify_error(text):
     return error_type, network, permission, cloud_api, internal
 
 
+def _error_signature(line):
+    sig = line.strip()
+    for pattern, repl in SIGNATURE_SCRUB:
+        sig = pattern.sub(repl, sig)
+    return re.sub(r"\s+", " ", sig).strip()[:200]
+
+
+def _stack_frames(text):
+    frames = []
+    for path, func in PY_FRAME_RE.findall(text):
+        if not any(v in path for v in VENDOR_FRAMES):
+            frames.append({"file": path, "symbol": func})
+    for cls, method in JVM_FRAME_RE.findall(text):
+        if not cls.startswith(VENDOR_FRAMES):
+            frames.append({"file": "", "symbol": f"{cls}.{method}"})
+    seen = set()
+    return [f for f in frames if not (f["symbol"] in seen or seen.add(f["symbol"]))]
+
+
+def _load_term_df(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            table = json.load(f)
+        return int(table.get("docs", 0)), dict(table.get("df", {})), list(table.get("bundles", []))
+    except Exception:
+        return 0, {}, []
+
+
+def _save_term_df(path, docs, df, bundles):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"docs": docs, "df": df, "bundles": bundles[-MAX_COUNTED_BUNDLES:]}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def _term_scores(signatures, frames):
+    scores = Counter()
+    for sig in signatures:
+        weight = math.log1p(sig["count"])
+        for exc in EXCEPTION_RE.findall(sig["signature"]):
+            scores[exc] += 2 * weight
+        for term in TERM_RE.findall(sig["signature"]):
+            if term.lower() not in TERM_STOP_WORDS:
+                scores[term.strip(".")] += weight
+    for frame in frames[:10]:
+        symbol = frame["symbol"].split(".")[-1]
+        owner = frame["symbol"].split(".")[-2] if "." in frame["symbol"] else ""
+        if not owner and frame["file"]:
+            owner = os.path.splitext(os.path.basename(frame["file"]))[0]
+        for term in (owner, symbol):
+            if term and not term.startswith("<") and term.lower() not in TERM_STOP_WORDS:
+                scores[term] += 1.0
+    return scores
+
+
+def _derive_jira_keywords(signatures, frames, limit=MAX_DERIVED_KEYWORDS):
+    # Weight = occurrences in the top signatures x rarity across previously seen log bundles
+    scores = _term_scores(signatures, frames)
+    docs, df, _ = _load_term_df(os.path.join(_cache_root(), "term_df.json"))
+    ranked = []
+    for term, score in scores.items():
+        if len(term) < 3:
+            continue
+        rarity = math.log((docs + 1.0) / (df.get(term.lower(), 0) + 1.0)) + 1.0
+        ranked.append((score * rarity, term))
+    ranked.sort(key=lambda x: (-x[0], x[1]))
+
+    keywords = []
+    for _, term in ranked:
+        if term.lower() not in (k.lower() for k in keywords):
+            keywords.append(term)
+        if len(keywords) >= limit:
+            break
+    return keywords
+
+
+def _record_term_df(signatures, frames):
+    """Count this log bundle's terms into term_df.json, once per bundle.
+
+    Called after the Jira search so keyword prioritisation never sees the current
+    bundle in the table; re-running the same bundle does not inflate the counts."""
+    scores = _term_scores(signatures, frames)
+    if not scores:
+        return False
+    raw = json.dumps(
+        [[s["signature"], s["count"]] for s in signatures] + [f["symbol"] for f in frames], ensure_ascii=False
+    )
+    bundle = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    df_path = os.path.join(_cache_root(), "term_df.json")
+    docs, df, bundles = _load_term_df(df_path)
+    if bundle in bundles:
+        return False
+    for term in set(t.lower() for t in scores):
+        df[term] = df.get(term, 0) + 1
+    _save_term_df(df_path, docs + 1, df, bundles + [bundle])
+    return True
+
+
 def _collect_log_files(root):
     paths = []
     for dirpath, _, filenames in os.walk(root):
@@ -68,6 +204,7 @@ def _analyze_logs(root):
     total_hits = 0
     first_time = ""
     error_blob = ""
+    signatures = Counter()
 
     for p in paths:
         lines = _read_lines(p)
@@ -75,6 +212,7 @@ def _analyze_logs(root):
         for idx, line in enumerate(lines):
             if any(k in line.lower() for k in keywords):
                 hits.append((idx, line))
+                signatures[_error_signature(line)] += 1
         if hits:
             total_hits += len(hits)
             if not first_time:
@@ -103,6 +241,8 @@ def _analyze_logs(root):
         "internal_exception": "Yes" if internal else "No",
         "core_log_excerpt": error_blob.strip(),
         "stack_trace_present": "Yes" if "traceback" in error_blob.lower() or "exception" in error_blob.lower() else "No",
+        "top_signatures": [{"signature": sig, "count": n} for sig, n in signatures.most_common(5) if sig],
+        "stack_frames": _stack_frames(error_blob)[:10],
     }
 
 
@@ -121,15 +261,257 @@ def _extract_archive(path):
         return ""
 
 
-def _ocr_image(path):
+def _cache_root():
+    return os.environ.get("ONEPRO_CACHE_DIR", "/tmp/onepro-cache")
+
+
+def _file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _preprocess_image(img, max_width=OCR_MAX_WIDTH):
+    img = img.convert("RGB")
+    if img.width > max_width:
+        height = max(int(img.height * max_width / float(img.width)), 1)
+        img = img.resize((max_width, height))
+    return img
+
+
+def _binarize(img):
+    from PIL import ImageOps, ImageStat  # type: ignore
+
+    gray = ImageOps.autocontrast(img.convert("L"))
+    # dark console themes: tesseract expects dark text on a light background
+    if ImageStat.Stat(gray).mean[0] < 128:
+        gray = ImageOps.invert(gray)
+    return gray.point(lambda p: 255 if p > 150 else 0)
+
+
+def _error_regions(img, grid=OCR_GRID, max_regions=OCR_MAX_REGIONS):
+    from PIL import Image, ImageChops  # type: ignore
+
+    r, g, b = img.split()
+    # red dominance: r - max(g, b), clipped at 0 by ImageChops.subtract
+    red = ImageChops.subtract(r, ImageChops.lighter(g, b)).point(lambda p: 255 if p > 80 else 0)
+    cols = max(img.width // grid, 1)
+    rows = max(img.height // grid, 1)
+    cells_px = red.resize((cols, rows), Image.BOX).load()
+    cells = set((x, y) for y in range(rows) for x in range(cols) if cells_px[x, y] > 8)
+
+    boxes = []
+    while cells:
+        stack = [cells.pop()]
+        xs, ys = [], []
+        while stack:
+            x, y = stack.pop()
+            xs.append(x)
+            ys.append(y)
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    n = (x + dx, y + dy)
+                    if n in cells:
+                        cells.remove(n)
+                        stack.append(n)
+        if len(xs) < 2:
+            continue
+        # error icons/borders sit next to the message: grow the box around the red area
+        boxes.append([min(xs) - 2, min(ys) - 2, max(xs) + 12, max(ys) + 3])
+
+    merged = []
+    for box in sorted(boxes):
+        if merged and box[0] <= merged[-1][2] and box[1] <= merged[-1][3] and box[3] >= merged[-1][1]:
+            last = merged[-1]
+            merged[-1] = [min(last[0], box[0]), min(last[1], box[1]), max(last[2], box[2]), max(last[3], box[3])]
+        else:
+            merged.append(box)
+
+    cell_w = img.width / float(cols)
+    cell_h = img.height / float(rows)
+    regions = []
+    for x0, y0, x1, y1 in merged:
+        regions.append(
+            (
+                max(int(x0 * cell_w), 0),
+                max(int(y0 * cell_h), 0),
+                min(int((x1 + 1) * cell_w), img.width),
+                min(int((y1 + 1) * cell_h), img.height),
+            )
+        )
+    regions.sort(key=lambda b: (b[2] - b[0]) * (b[3] - b[1]), reverse=True)
+    return regions[:max_regions]
+
+
+_INSTALLED_LANGS = None
+
+
+def _installed_langs():
+    # one `tesseract --list-langs` per process; empty when it cannot be listed
+    global _INSTALLED_LANGS
+    if _INSTALLED_LANGS is None:
+        try:
+            import pytesseract  # type: ignore
+
+            _INSTALLED_LANGS = set(pytesseract.get_languages(config=""))
+        except Exception:
+            _INSTALLED_LANGS = set()
+    return _INSTALLED_LANGS
+
+
+def _effective_lang(lang):
+    """The requested packs that are installed (e.g. chi_sim+eng -> eng without the
+    Chinese pack); `lang` unchanged when the installed packs are unknown."""
+    installed = _installed_langs()
+    if not installed:
+        return lang
+    return "+".join(p for p in lang.split("+") if p in installed) or "eng"
+
+
+def _tesseract(img, lang, config=""):
+    import pytesseract  # type: ignore
+
+    return pytesseract.image_to_string(img, lang=lang, config=config)
+
+
+def _ocr_image(path, lang=OCR_LANG, use_cache=True):
+    result = {
+        "path": path,
+        "text": "",
+        "regions": [],
+        "mode": "",
+        "cached": False,
+        "elapsed_ms": 0,
+    }
+    start = time.monotonic()
+    try:
+        digest = _file_hash(path)
+    except OSError as e:
+        result["error"] = str(e)
+        return result
+
+    # keyed by the packs that will actually run: a fallback result must not stand
+    # in for the requested packs once they are installed
+    lang = _effective_lang(lang)
+    cache_dir = os.path.join(_cache_root(), "ocr")
+    cache_file = os.path.join(cache_dir, f"{digest}.{lang}.json")
+    if use_cache and os.path.exists(cache_file):
+        try:
+            with open(cache_file, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            result.update(cached)
+            result["cached"] = True
+            result["elapsed_ms"] = int((time.monotonic() - start) * 1000)
+            return result
+        except Exception:
+            pass
+
     try:
         from PIL import Image  # type: ignore
-        import pytesseract  # type: ignore
 
-        img = Image.open(path)
-        return pytesseract.image_to_string(img)
-    except Exception:
-        return ""
+        img = _preprocess_image(Image.open(path))
+        regions = _error_regions(img)
+        covered = sum((b[2] - b[0]) * (b[3] - b[1]) for b in regions)
+        if regions and covered < img.width * img.height * 0.6:
+            texts = []
+            for box in regions:
+                text = _tesseract(_binarize(img.crop(box)), lang, config="--psm 6").strip()
+                if text:
+                    texts.append(text)
+            result["mode"] = "regions"
+            result["regions"] = [list(b) for b in regions]
+            result["text"] = "\n".join(texts)
+        if not result["text"]:
+            result["mode"] = "full"
+            result["text"] = _tesseract(_binarize(img), lang)
+        result["lang"] = lang
+    except Exception as e:
+        result["error"] = str(e)
+        result["elapsed_ms"] = int((time.monotonic() - start) * 1000)
+        return result
+
+    result["elapsed_ms"] = int((time.monotonic() - start) * 1000)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_file, "w", encoding="utf-8") as f:
+            json.dump(
+                {"text": result["text"], "regions": result["regions"], "mode": result["mode"], "lang": lang},
+                f,
+                ensure_ascii=False,
+            )
+    except OSError:
+        pass
+    return result
+
+
+def _collect_screenshots(paths):
+    images = []
+    for p in paths:
+        if os.path.isdir(p):
+            for fn in sorted(os.listdir(p)):
+                if fn.lower().endswith(IMAGE_EXTS):
+                    images.append(os.path.join(p, fn))
+        elif p:
+            images.append(p)
+    seen = set()
+    return [p for p in images if not (p in seen or seen.add(p))]
+
+
+def _screenshot_findings(text):
+    errors = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and any(k in line.lower() for k in ERROR_WORDS) and line not in errors:
+            errors.append(line)
+    return {
+        "error_texts": errors,
+        "timestamps": sorted(set(TIMESTAMP_RE.findall(text))),
+        "ips": sorted(set(IP_RE.findall(text))),
+    }
+
+
+def _submit_ocr(images, lang, use_cache):
+    if not images:
+        return None, []
+    # list the installed packs before forking, so workers inherit the answer
+    lang = _effective_lang(lang)
+    # even a single screenshot goes to a worker so it overlaps with the log scan
+    workers = min(len(images), os.cpu_count() or 1)
+    pool = ProcessPoolExecutor(max_workers=workers)
+    return pool, [pool.submit(_ocr_image, p, lang, use_cache) for p in images]
+
+
+def _collect_ocr(pool, jobs):
+    results = []
+    for job in jobs:
+        try:
+            results.append(job.result())
+        except Exception as e:
+            results.append({"text": "", "error": str(e)})
+    if pool is not None:
+        pool.shutdown()
+    return results
+
+
+def _merge_screenshots(images, results):
+    per_image = []
+    texts = []
+    merged = {"error_texts": [], "timestamps": [], "ips": []}
+    for path, res in zip(images, results):
+        text = res.get("text", "")
+        findings = _screenshot_findings(text)
+        for key, values in findings.items():
+            merged[key].extend(v for v in values if v not in merged[key])
+        if text.strip():
+            texts.append(text.strip())
+        entry = {k: v for k, v in res.items() if k != "text"}
+        entry["path"] = path
+        entry.update(findings)
+        per_image.append(entry)
+    merged["timestamps"].sort()
+    return "\n\n".join(texts), merged, per_image
 
 
 def main():
@@ -142,10 +524,19 @@ def main():
     parser.add_argument("--class", dest="class_name", default="")
     parser.add_argument("--method", dest="method_name", default="")
     parser.add_argument("--max", type=int, default=5)
+    parser.add_argument("--no-derive-keywords", action="store_true", help="do not rank Jira results by log-derived keywords")
     parser.add_argument("--skip-code", action="store_true")
     parser.add_argument("--log-archive", default="")
     parser.add_argument("--log-path", default="")
-    parser.add_argument("--screenshot", default="")
+    parser.add_argument(
+        "--screenshot",
+        nargs="+",
+        action="extend",
+        default=[],
+        help="screenshot files or directories (repeatable)",
+    )
+    parser.add_argument("--ocr-lang", default=OCR_LANG, help="tesseract language packs, e.g. chi_sim+eng")
+    parser.add_argument("--no-ocr-cache", action="store_true")
     parser.add_argument("--output-md", action="store_true")
     parser.add_argument("--output-file", default="")
     args = parser.parse_args()
@@ -153,10 +544,11 @@ def main():
     env = os.environ.copy()
 
     attachment_types = []
-    screenshot_text = ""
-    if args.screenshot:
+    images = _collect_screenshots(args.screenshot)
+    if images:
         attachment_types.append("screenshot")
-        screenshot_text = _ocr_image(args.screenshot)
+    # OCR runs in worker processes while the logs are scanned below
+    ocr_pool, ocr_jobs = _submit_ocr(images, args.ocr_lang, not args.no_ocr_cache)
 
     log_root = ""
     if args.log_path:
@@ -177,11 +569,20 @@ def main():
         "internal_exception": "Unknown",
         "core_log_excerpt": "",
         "stack_trace_present": "Unknown",
+        "top_signatures": [],
+        "stack_frames": [],
     }
 
     if log_root:
         log_result = _analyze_logs(log_root)
 
+    derived_keywords = []
+    if not args.no_derive_keywords:
+        derived_keywords = _derive_jira_keywords(log_result["top_signatures"], log_result["stack_frames"])
+
+    ocr_results = _collect_ocr(ocr_pool, ocr_jobs)
+    screenshot_text, screenshot_findings, screenshots = _merge_screenshots(images, ocr_results)
+
     # Jira search
     jira_cmd = [
         "python3",
@@ -197,6 +598,9 @@ def main():
         "--max",
         str(args.max),
     ]
+    if derived_keywords:
+        # log terms only rank what the user's query finds; ORed into the JQL they would widen it
+        jira_cmd.extend(["--boost-keywords", ",".join(derived_keywords)])
     jira_raw = ""
     jira_json = {}
     try:
@@ -204,6 +608,8 @@ def main():
         jira_json = json.loads(jira_raw)
     except Exception as e:
         jira_json = {"error": "jira_failed", "detail": str(e), "raw": jira_raw}
+    if log_root and not args.no_derive_keywords:
+        _record_term_df(log_result["top_signatures"], log_result["stack_frames"])
 
     # Code locate (optional)
     code_json = {}
@@ -214,7 +620,8 @@ def main():
             "python3",
             os.path.join(os.path.dirname(__file__), "code_locate.py"),
             "--module",
-            args.module,
+            # unknown module: let code_locate rank the repositories and pick one
+            args.module or "auto",
             "--product",
             args.product,
             "--version",
@@ -227,6 +634,9 @@ def main():
             args.method_name,
             "--list-branches",
         ]
+        if not args.module:
+            # ranking all repos must not clone or fetch each of them: search the ones checked out before
+            code_cmd.append("--cached-only")
         try:
             code_raw = _run(code_cmd, env=env)
             code_json = json.loads(code_raw)
@@ -247,11 +657,14 @@ def main():
             "product": args.product,
             "stage": args.stage,
             "version": args.version,
-            "detected_module": args.module,
+            "detected_module": args.module or code_json.get("selected_module", ""),
             "keywords": args.query,
+            "derived_keywords": derived_keywords,
             "attachment_types": attachment_types,
             "stack_trace_present": log_result.get("stack_trace_present", "Unknown"),
             "screenshot_text": screenshot_text,
+            "screenshot_findings": screenshot_findings,
+            "screenshots": screenshots,
         },
         "log_analysis_result": log_result,
         "stage_consistency": {
@@ -303,8 +716,22 @@ def main():
     print(content)
 
 
+def _format_call_chain(code_loc):
+    chains = code_loc.get("call_chains") or {}
+    # longest structured chain first, falling back to the grep candidates
+    best = max(chains.get("upstream", []) + chains.get("downstream", []), key=len, default=None)
+    if best:
+        return " -> ".join(
+            f"{n['parent'] + '.' if n.get('parent') else ''}{n['name']} ({os.path.basename(n.get('file', ''))}:{n.get('line') or '?'})"
+            for n in best
+        )
+    candidates = code_loc.get("call_chain_candidates") or []
+    return candidates[0].get("text", "") if candidates else ""
+
+
 def _render_markdown(data):
     basic = data.get("input_analysis", {})
+    shot = basic.get("screenshot_findings", {})
     log_res = data.get("log_analysis_result", {})
     stage = data.get("stage_consistency", {})
     jira = data.get("jira_match_result", {})
@@ -348,6 +775,9 @@ def _render_markdown(data):
         "## 3. Evidence Chain",
         "### Screenshot Findings",
         f"- {basic.get('screenshot_text','')[:200].replace(chr(10),' ')}",
+        *[f"- {e}" for e in shot.get("error_texts", [])[:5]],
+        f"- Timestamps: {', '.join(shot.get('timestamps', []))}",
+        f"- IP/Endpoints: {', '.join(shot.get('ips', []))}",
         "",
         "### Log Findings",
         f"- Network Related: {log_res.get('network_related','')}",
@@ -364,6 +794,8 @@ def _render_markdown(data):
         "| --- | --- | --- | --- | --- | --- | --- |",
         *jira_rows,
         "",
+        f"Existing Fix Version Available: {jira.get('existing_fix_version_available', 'Unknown')}",
+        "",
         "## 6. Code Localization (if triggered)",
         f"- Triggered: {data.get('code_analysis',{}).get('triggered','')}",
         f"- Reason: {data.get('code_analysis',{}).get('reason','')}",
@@ -372,7 +804,7 @@ def _render_markdown(data):
         f"- File Path: {'' if not code_loc.get('hits') else code_loc.get('hits')[0].get('file','')}",
         f"- Class: {data.get('input',{}).get('class','')}",
         f"- Method: {data.get('input',{}).get('method','')}",
-        f"- Call Chain: {'' if not code_loc.get('call_chain_candidates') else code_loc.get('call_chain_candidates')[0].get('text','')}",
+        f"- Call Chain: {_format_call_chain(code_loc)}",
         "",
         "## 7. Root Cause Probability Table (Total = 100%)",
         "| Category | Probability |",
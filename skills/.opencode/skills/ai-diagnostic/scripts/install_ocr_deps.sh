@@ -3,11 +3,13 @@ set -euo pipefail
 
 python3 -m pip install --user -r "$(dirname "$0")/requirements.txt"
 
-# Optional: system tesseract (Ubuntu)
+# Optional: system tesseract + Chinese language pack (Ubuntu)
 if command -v apt-get >/dev/null 2>&1; then
   if ! command -v tesseract >/dev/null 2>&1; then
     sudo apt-get update
-    sudo apt-get install -y tesseract-ocr
+    sudo apt-get install -y tesseract-ocr tesseract-ocr-chi-sim
+  elif ! tesseract --list-langs 2>/dev/null | grep -q '^chi_sim$'; then
+    sudo apt-get install -y tesseract-ocr-chi-sim
   fi
 fi
 
@@ -1,14 +1,52 @@
 #!/usr/bin/env python3
 import argparse
+import asyncio
 import base64
+import gzip
+import hashlib
+import http.client
 import json
+import math
 import os
+import queue
+import random
 import re
+import sqlite3
 import sys
-import urllib.error
+import threading
+import time
 import urllib.parse
-import urllib.request
-from datetime import datetime
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+MIRROR_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS issues (
+        id INTEGER PRIMARY KEY,
+        key TEXT UNIQUE NOT NULL,
+        project TEXT NOT NULL,
+        updated TEXT,
+        fields TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS issues_project_updated ON issues (project, updated)",
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS issues_fts USING fts5(
+        summary, description, comments, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sync_state (
+        project TEXT PRIMARY KEY,
+        watermark TEXT,
+        synced_at TEXT,
+        total INTEGER
+    )
+    """,
+    "CREATE TABLE IF NOT EXISTS mirror_meta (name TEXT PRIMARY KEY, value TEXT)",
+]
 
 DEFAULT_FIELDS = [
     "summary",
@@ -24,6 +62,11 @@ DEFAULT_FIELDS = [
     "issuetype",
 ]
 
+LIGHT_FIELDS = ["summary", "issuetype", "updated", "labels"]
+LAZY_FIELDS = ["description", "comment"]
+MAX_JQL_KEYWORDS = 6
+RETRY_STATUSES = (429, 502, 503, 504)
+
 STOP_WORDS = set(
     [
         "the",
@@ -58,13 +101,39 @@ STOP_WORDS = set(
 )
 
 
+TOKEN_RE = re.compile(r"[A-Za-z0-9_.-]+|[\u3400-\u9fff\uf900-\ufaff]+")
+CJK_RE = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]")
+BM25_K1 = 1.2
+BM25_B = 0.75
+DIGITS_RE = re.compile(r"\d+")
+SIMHASH_BITS = 64
+SIMHASH_MAX_CHARS = 4000
+DEDUPE_DISTANCE = 6
+VERSION_NUM_RE = re.compile(r"\d+")
+PRERELEASE_RE = re.compile(r"[-_.]?(alpha|beta|rc|pre|snapshot|dev)", re.IGNORECASE)
+
+
 def _tokenize(text):
     if not text:
         return []
-    tokens = re.findall(r"[A-Za-z0-9_.-]+", text.lower())
+    tokens = TOKEN_RE.findall(text.lower())
     return [t for t in tokens if t not in STOP_WORDS and len(t) > 1]
 
 
+def _analyze(text):
+    # scoring terms: ASCII tokens as-is, CJK runs as overlapping bigrams
+    terms = []
+    for tok in TOKEN_RE.findall((text or "").lower()):
+        if CJK_RE.match(tok):
+            if len(tok) == 1:
+                terms.append(tok)
+            else:
+                terms.extend(tok[i : i + 2] for i in range(len(tok) - 1))
+        elif tok not in STOP_WORDS and len(tok) > 1:
+            terms.append(tok)
+    return terms
+
+
 def _safe_text(value):
     if value is None:
         return ""
@@ -104,173 +173,1331 @@ def _latest_fix_version(fix_versions):
         return fix_versions[0].get("name") if isinstance(fix_versions[0], dict) else ""
 
 
-def _compute_similarity(query_tokens, issue_text):
-    if not query_tokens:
-        return 0.0
-    text_tokens = set(_tokenize(issue_text))
-    if not text_tokens:
-        return 0.0
-    hit = sum(1 for t in query_tokens if t in text_tokens)
-    return round(hit / max(len(query_tokens), 1), 3)
+class BM25Index:
+    def __init__(self, docs, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.doc_len = []
+        for doc_id, text in enumerate(docs):
+            tf = Counter(_analyze(text))
+            self.doc_len.append(sum(tf.values()))
+            for term, count in tf.items():
+                self.postings.setdefault(term, []).append((doc_id, count))
+        self.n_docs = len(self.doc_len)
+        self.avgdl = (sum(self.doc_len) / float(self.n_docs)) if self.n_docs else 0.0
+
+    def idf(self, term):
+        df = len(self.postings.get(term, ()))
+        return math.log(1.0 + (self.n_docs - df + 0.5) / (df + 0.5))
+
+    def scores(self, query):
+        # accumulate over posting lists only: documents without any query term stay at 0
+        terms = set(_analyze(query) if isinstance(query, str) else query)
+        totals = [0.0] * self.n_docs
+        ceiling = 0.0
+        for term in terms:
+            idf = self.idf(term)
+            ceiling += idf * (self.k1 + 1.0)
+            for doc_id, tf in self.postings.get(term, ()):
+                norm = self.k1 * (1.0 - self.b + self.b * self.doc_len[doc_id] / (self.avgdl or 1.0))
+                totals[doc_id] += idf * tf * (self.k1 + 1.0) / (tf + norm)
+        if not ceiling:
+            return totals
+        # normalise against the tf -> infinity bound so similarity stays in [0, 1]
+        return [round(t / ceiling, 3) for t in totals]
+
+    def score_docs(self, docs, query):
+        """Score documents outside the index against its term statistics.
+
+        IDF comes from the indexed pool, so a subset of it scores the same whichever
+        other issues made the cut; lengths are normalised among `docs`, which may
+        carry more fields (description, comments) than the indexed texts."""
+        terms = set(_analyze(query) if isinstance(query, str) else query)
+        idf = {term: self.idf(term) for term in terms}
+        ceiling = sum(idf.values()) * (self.k1 + 1.0)
+        tfs = [Counter(_analyze(text)) for text in docs]
+        lengths = [sum(tf.values()) for tf in tfs]
+        avgdl = (sum(lengths) / float(len(lengths))) if lengths else 0.0
+        totals = []
+        for tf, dl in zip(tfs, lengths):
+            norm = self.k1 * (1.0 - self.b + self.b * dl / (avgdl or 1.0))
+            totals.append(sum(idf[t] * tf[t] * (self.k1 + 1.0) / (tf[t] + norm) for t in terms if tf[t]))
+        if not ceiling:
+            return totals
+        return [round(t / ceiling, 3) for t in totals]
+
+
+def _term_hash(term):
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(weights):
+    if not weights:
+        return None
+    v = [0] * SIMHASH_BITS
+    for term, w in weights.items():
+        h = _term_hash(term)
+        for bit in range(SIMHASH_BITS):
+            v[bit] += w if (h >> bit) & 1 else -w
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if v[bit] > 0)
+
+
+def _dedupe_weights(fields_obj):
+    # presence rather than tf, so repeated log boilerplate in descriptions cannot dominate;
+    # numbers (IPs, ticket ids, sizes) differ between otherwise identical escalations
+    weights = {}
+    for term in _analyze(DIGITS_RE.sub("0", _safe_text(fields_obj.get("description"))[:SIMHASH_MAX_CHARS])):
+        weights[term] = 1
+    for term in _analyze(DIGITS_RE.sub("0", fields_obj.get("summary") or "")):
+        weights[term] = 2
+    return weights
+
+
+def collapse_duplicates(items, distance=DEDUPE_DISTANCE):
+    """Greedy leader clustering of ranked items by SimHash Hamming distance.
+
+    Returns [(representative, [duplicate items])] in input order. Band lookups make it
+    linear in practice: with bands = distance + 1 a pair within `distance` bits always
+    shares at least one band exactly (pigeonhole)."""
+    bands = distance + 1
+    width = SIMHASH_BITS // bands
+    mask = (1 << width) - 1
+    buckets = {}
+    groups = []
+    for item in items:
+        sig = simhash(_dedupe_weights(item.get("fields", {}) or {}))
+        leader = None
+        if sig is not None:
+            seen = set()
+            for band in range(bands):
+                for idx in buckets.get((band, (sig >> (band * width)) & mask), ()):
+                    if idx in seen:
+                        continue
+                    seen.add(idx)
+                    if bin(groups[idx][2] ^ sig).count("1") <= distance:
+                        leader = idx
+                        break
+                if leader is not None:
+                    break
+        if leader is not None:
+            groups[leader][1].append(item)
+            continue
+        groups.append((item, [], sig))
+        if sig is not None:
+            for band in range(bands):
+                buckets.setdefault((band, (sig >> (band * width)) & mask), []).append(len(groups) - 1)
+    return [(rep, dups) for rep, dups, _ in groups]
+
+
+def _jql_quote(value):
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _load_term_df():
+    # document frequencies collected by diagnose_pipeline.py from previously seen log bundles
+    try:
+        with open(os.path.join(_cache_root(), "term_df.json"), "r", encoding="utf-8") as f:
+            table = json.load(f)
+        return int(table.get("docs", 0)), dict(table.get("df", {}))
+    except Exception:
+        return 0, {}
+
+
+def prioritize_keywords(keywords, limit=MAX_JQL_KEYWORDS):
+    docs, df = _load_term_df()
+
+    def rarity(k):
+        return math.log((docs + 1.0) / (df.get(k.lower(), 0) + 1.0))
+
+    # rarer first; without statistics longer (more specific) terms win, a CJK character counting double
+    ranked = sorted(keywords, key=lambda k: (-rarity(k), -(len(k) + len(CJK_RE.findall(k)))))
+    return ranked[:limit], ranked[limit:]
 
 
 def build_jql(keywords, stage=None, module=None, version=None, project_keys=None):
     keywords = [k for k in keywords if k]
     if not keywords:
         keywords = ["error"]
-    keyword_expr = " OR ".join(
-        [
-            f'summary ~ "{k}" OR description ~ "{k}" OR text ~ "{k}"'
-            for k in keywords
-        ]
-    )
-    clauses = [f"({keyword_expr})"]
+    # text ~ already covers summary, description, environment and comments
+    clauses = ["(" + " OR ".join(f"text ~ {_jql_quote(k)}" for k in keywords) + ")"]
+    for extra in (stage, module, version):
+        if extra:
+            clauses.append(f"text ~ {_jql_quote(extra)}")
 
-    if stage:
-        clauses.append(f'(summary ~ "{stage}" OR description ~ "{stage}" OR text ~ "{stage}")')
-    if module:
-        clauses.append(f'(summary ~ "{module}" OR description ~ "{module}" OR text ~ "{module}")')
-    if version:
-        clauses.append(f'(summary ~ "{version}" OR description ~ "{version}" OR text ~ "{version}")')
-
-    if project_keys:
+    if project_keys and len(project_keys) == 1:
+        clauses.insert(0, f"project = {project_keys[0]}")
+    elif project_keys:
         keys = ", ".join(project_keys)
         clauses.insert(0, f"project in ({keys})")
 
     return " AND ".join(clauses) + " ORDER BY updated DESC"
 
 
-def request_jira(base_url, user, password, jql, max_results, fields):
-    auth_raw = f"{user}:{password}".encode("utf-8")
-    token = base64.b64encode(auth_raw).decode("utf-8")
-    payload = {
-        "jql": jql,
-        "maxResults": max_results,
-        "fields": fields,
+def plan_queries(
+    keywords,
+    stage=None,
+    module=None,
+    version=None,
+    project_keys=None,
+    max_keywords=MAX_JQL_KEYWORDS,
+    fan_out=1,
+    per_project=False,
+    derived_keywords=None,
+    boost_keywords=None,
+):
+    # terms already required through stage/module/version would only repeat that clause
+    required = set(str(x).lower() for x in (stage, module, version) if x)
+    terms = [k for k in keywords if k and k.lower() not in required]
+    # the query's own terms always stay; derived ones fill the remaining slots, rarest first
+    seen = required | set(k.lower() for k in terms)
+    extra, dropped = prioritize_keywords(
+        [k for k in derived_keywords or () if k and k.lower() not in seen], max(0, max_keywords - len(terms))
+    )
+    selected = terms + extra
+    seen |= set(k.lower() for k in extra)
+    fan_out = max(1, min(fan_out, len(selected) or 1))
+    # round-robin so every sub-query gets a mix of rare and common terms
+    groups = [selected[i::fan_out] for i in range(fan_out)]
+    plan = {
+        "jql": build_jql(selected, stage=stage, module=module, version=version, project_keys=project_keys),
+        "keywords": selected,
+        "dropped_keywords": dropped,
+        # ranking-only terms: they reorder what the query finds but never widen it
+        "boost_keywords": [k for k in boost_keywords or () if k and k.lower() not in seen],
+        "queries": [
+            build_jql(g, stage=stage, module=module, version=version, project_keys=project_keys) for g in groups
+        ],
+    }
+    if per_project and project_keys and len(project_keys) > 1:
+        # one "project = X" query per project instead of a combined "project in (...)"
+        plan["projects"] = {
+            p: [build_jql(g, stage=stage, module=module, version=version, project_keys=[p]) for g in groups]
+            for p in project_keys
+        }
+        plan["queries"] = [q for qs in plan["projects"].values() for q in qs]
+    return plan
+
+
+def _cache_root():
+    return os.environ.get("ONEPRO_CACHE_DIR", "/tmp/onepro-cache")
+
+
+def _mirror_path():
+    return os.environ.get("JIRA_MIRROR_DB", os.path.join(_cache_root(), "jira_mirror.db"))
+
+
+def open_mirror(db_path):
+    parent = os.path.dirname(db_path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    for stmt in MIRROR_SCHEMA:
+        conn.execute(stmt)
+    return conn
+
+
+def _fts_text(text):
+    # unicode61 keeps a run of CJK characters as one token: split them so any
+    # substring can be matched as a phrase of single characters
+    return re.sub(r"([\u3400-\u9fff\uf900-\ufaff])", r" \1 ", text or "")
+
+
+def _fts_phrase(term):
+    words = _fts_text(term).replace('"', " ").split()
+    return '"' + " ".join(words) + '"' if words else ""
+
+
+def build_fts_query(keywords, stage=None, module=None, version=None):
+    phrases = [p for p in (_fts_phrase(k) for k in keywords if k) if p]
+    clauses = []
+    if phrases:
+        clauses.append("(" + " OR ".join(phrases) + ")")
+    for extra in (stage, module, version):
+        phrase = _fts_phrase(extra) if extra else ""
+        if phrase:
+            clauses.append(phrase)
+    return " AND ".join(clauses)
+
+
+def _comment_text(fields_obj):
+    comment = fields_obj.get("comment")
+    if not isinstance(comment, dict):
+        return ""
+    return "\n".join((c.get("body") or "") for c in comment.get("comments", []) or [])
+
+
+def mirror_set_meta(conn, name, value):
+    conn.execute(
+        "INSERT INTO mirror_meta (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+        (name, value),
+    )
+
+
+def mirror_meta(db_path, name):
+    if not os.path.exists(db_path):
+        return ""
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            row = conn.execute("SELECT value FROM mirror_meta WHERE name = ?", (name,)).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return ""
+    return row[0] if row else ""
+
+
+def mirror_upsert(conn, issue):
+    key = issue.get("key", "")
+    fields_obj = issue.get("fields", {}) or {}
+    project = key.split("-", 1)[0]
+    conn.execute(
+        "INSERT INTO issues (key, project, updated, fields) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET project = excluded.project, updated = excluded.updated, fields = excluded.fields",
+        (key, project, fields_obj.get("updated", ""), json.dumps(fields_obj, ensure_ascii=False)),
+    )
+    row_id = conn.execute("SELECT id FROM issues WHERE key = ?", (key,)).fetchone()[0]
+    conn.execute("DELETE FROM issues_fts WHERE rowid = ?", (row_id,))
+    conn.execute(
+        "INSERT INTO issues_fts (rowid, summary, description, comments) VALUES (?, ?, ?, ?)",
+        (
+            row_id,
+            _fts_text(fields_obj.get("summary") or ""),
+            _fts_text(_safe_text(fields_obj.get("description"))),
+            _fts_text(_comment_text(fields_obj)),
+        ),
+    )
+
+
+def search_mirror(conn, fts_query, max_results, project_keys=None):
+    if not fts_query:
+        return []
+    sql = (
+        "SELECT issues.key, issues.fields FROM issues_fts "
+        "JOIN issues ON issues.id = issues_fts.rowid "
+        "WHERE issues_fts MATCH ?"
+    )
+    params = [fts_query]
+    if project_keys:
+        sql += " AND issues.project IN (%s)" % ", ".join("?" for _ in project_keys)
+        params.extend(project_keys)
+    sql += " ORDER BY issues_fts.rank LIMIT ?"
+    params.append(max_results)
+    return [{"key": key, "fields": json.loads(raw)} for key, raw in conn.execute(sql, params)]
+
+
+def normalize_jql(jql):
+    return re.sub(r"\s+", " ", (jql or "").strip()).lower()
+
+
+class QueryCache:
+    def __init__(self, cache_dir, ttl=600.0, stale_ttl=3600.0, refresh=False):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.refresh = refresh
+        self._memory = {}
+        self._lock = threading.Lock()
+        self._revalidating = {}
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshed": 0}
+
+    @staticmethod
+    def make_key(*parts):
+        raw = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def _load(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+        if entry is not None:
+            return entry
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self._memory[key] = entry
+        return entry
+
+    def get(self, key):
+        """Last stored value whatever its age, or None; never fetches."""
+        entry = self._load(key)
+        return entry.get("value") if entry is not None else None
+
+    def store(self, key, value):
+        entry = {"stored_at": time.time(), "value": value}
+        with self._lock:
+            self._memory[key] = entry
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def get_or_fetch(self, key, fetch):
+        entry = None if self.refresh else self._load(key)
+        if entry is not None:
+            age = time.time() - entry.get("stored_at", 0)
+            if age <= self.ttl:
+                self._count("hits")
+                return entry["value"]
+            if age <= self.ttl + self.stale_ttl:
+                # serve the stale copy now, refresh it in the background
+                self._count("stale_hits")
+                self._revalidate(key, fetch)
+                return entry["value"]
+        self._count("refreshed" if self.refresh else "misses")
+        value = fetch()
+        self.store(key, value)
+        return value
+
+    def _revalidate(self, key, fetch):
+        def run():
+            try:
+                self.store(key, fetch())
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._revalidating.pop(key, None)
+
+        with self._lock:
+            if key in self._revalidating:
+                return
+            worker = threading.Thread(target=run, daemon=True)
+            self._revalidating[key] = worker
+        worker.start()
+
+    def wait(self, timeout=None):
+        with self._lock:
+            workers = list(self._revalidating.values())
+        for worker in workers:
+            worker.join(timeout)
+
+    def report(self):
+        report = dict(self.stats)
+        report.update({"ttl": self.ttl, "stale_ttl": self.stale_ttl, "dir": self.cache_dir})
+        return report
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(rate, 1.0))
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                delay = (1.0 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def _retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class JiraClient:
+    def __init__(
+        self,
+        base_url,
+        user,
+        password,
+        connect_timeout=5.0,
+        read_timeout=20.0,
+        pool_size=4,
+        cache=None,
+        rate=0.0,
+        burst=None,
+        max_in_flight=4,
+        max_retries=4,
+        backoff_base=0.5,
+        backoff_max=30.0,
+    ):
+        parsed = urllib.parse.urlparse(base_url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise ValueError(f"invalid Jira base url: {base_url}")
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.base_path = parsed.path.rstrip("/")
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        token = base64.b64encode(f"{user}:{password}".encode("utf-8")).decode("utf-8")
+        self._auth = f"Basic {token}"
+        self._identity = f"{self.scheme}://{self.host}:{self.port}{self.base_path}|{user}"
+        self.cache = cache
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+        self._bucket = TokenBucket(rate, burst)
+        self._in_flight = threading.BoundedSemaphore(max(1, max_in_flight))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats = {
+            "requests": 0,
+            "connections_opened": 0,
+            "connections_reused": 0,
+            "bytes_received": 0,
+            "bytes_decoded": 0,
+            "retries": 0,
+            "throttled": 0,
+            "backoff_ms": 0,
+            "rate_limit_wait_ms": 0,
+            "in_flight_wait_ms": 0,
+        }
+
+    def _count(self, key, value=1):
+        with self._lock:
+            self.stats[key] += value
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        conn = cls(self.host, self.port, timeout=self.connect_timeout)
+        conn.connect()
+        conn.sock.settimeout(self.read_timeout)
+        self._count("connections_opened")
+        return conn
+
+    def _acquire(self):
+        try:
+            conn = self._idle.get_nowait()
+            self._count("connections_reused")
+            return conn, True
+        except queue.Empty:
+            return self._connect(), False
+
+    def _release(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def request(self, method, path, payload=None, params=None):
+        url = self.base_path + path
+        if params:
+            url += "?" + urllib.parse.urlencode(params)
+        headers = {
+            "Authorization": self._auth,
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip",
+            "Connection": "keep-alive",
+        }
+        body = None
+        if payload is not None:
+            body = json.dumps(payload).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        for attempt in range(self.max_retries + 1):
+            waited = self._bucket.acquire()
+            if waited:
+                self._count("rate_limit_wait_ms", int(waited * 1000))
+            start = time.monotonic()
+            with self._in_flight:
+                self._count("in_flight_wait_ms", int((time.monotonic() - start) * 1000))
+                status, retry_after, text = self._send(method, url, body, headers)
+            if status in RETRY_STATUSES and attempt < self.max_retries:
+                # throttled or gateway hiccup: honour Retry-After, else exponential backoff with jitter
+                delay = _retry_after(retry_after)
+                if delay is None:
+                    delay = self.backoff_base * (2 ** attempt) * (0.5 + random.random())
+                delay = min(delay, self.backoff_max)
+                self._count("retries")
+                if status in (429, 503):
+                    self._count("throttled")
+                self._count("backoff_ms", int(delay * 1000))
+                time.sleep(delay)
+                continue
+            if status >= 400:
+                raise RuntimeError(f"Jira HTTPError {status}: {text}")
+            try:
+                return json.loads(text)
+            except ValueError as e:
+                raise RuntimeError(f"Jira request failed: invalid JSON ({e})")
+        raise RuntimeError("Jira request failed: retries exhausted")
+
+    def _send(self, method, url, body, headers):
+        for attempt in range(2):
+            try:
+                conn, reused = self._acquire()
+            except Exception as e:
+                raise RuntimeError(f"Jira request failed: {e}")
+            try:
+                conn.request(method, url, body=body, headers=headers)
+                resp = conn.getresponse()
+                raw = resp.read()
+            except (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionError) as e:
+                conn.close()
+                # idle keep-alive connection dropped by the server: retry once on a fresh one
+                if reused and attempt == 0:
+                    continue
+                raise RuntimeError(f"Jira request failed: {e}")
+            except Exception as e:
+                conn.close()
+                raise RuntimeError(f"Jira request failed: {e}")
+
+            if resp.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            self._count("requests")
+            self._count("bytes_received", len(raw))
+            if (resp.getheader("Content-Encoding") or "").lower() == "gzip":
+                raw = gzip.decompress(raw)
+            self._count("bytes_decoded", len(raw))
+            return resp.status, resp.getheader("Retry-After"), raw.decode("utf-8", errors="ignore")
+        raise RuntimeError("Jira request failed: connection reset")
+
+    def search(self, jql, max_results, fields, start_at=0):
+        payload = {
+            "jql": jql,
+            "startAt": start_at,
+            "maxResults": max_results,
+            "fields": fields,
+        }
+        cache_key = ("search", normalize_jql(jql), sorted(fields), max_results, start_at)
+        return self._cached(cache_key, lambda: self.request("POST", "/rest/api/2/search", payload=payload))
+
+    def comments(self, key, max_results=3):
+        path = f"/rest/api/2/issue/{urllib.parse.quote(key)}/comment"
+        params = {"maxResults": max_results, "orderBy": "-created"}
+        return self._cached(("comments", key.upper(), max_results), lambda: self.request("GET", path, params=params))
+
+    def _cached(self, parts, fetch):
+        if self.cache is None:
+            return fetch()
+        return self.cache.get_or_fetch(QueryCache.make_key(self._identity, *parts), fetch)
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.wait(timeout=self.read_timeout)
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def version_key(name):
+    """Comparable key for release names such as v3.2.1, 3.2.0-rc1 or HyperBDR_release_v6.5.0.
+
+    Trailing zeros are dropped (3.2 == 3.2.0) and pre-releases sort before the release."""
+    if not name:
+        return None
+    text = str(name)
+    m = PRERELEASE_RE.search(text)
+    main, pre = (text[: m.start()], text[m.end() :]) if m else (text, "")
+    nums = [int(n) for n in VERSION_NUM_RE.findall(main)]
+    if not nums:
+        return None
+    while len(nums) > 1 and nums[-1] == 0:
+        nums.pop()
+    return (tuple(nums), 0 if m else 1, tuple(int(n) for n in VERSION_NUM_RE.findall(pre)))
+
+
+class VersionCatalog:
+    """Per-project release catalog from /rest/api/2/project/{key}/versions.
+
+    Fetched once per project and kept in a TTL cache; parsed keys are held in
+    memory so ordering fix versions and comparing them with the customer's
+    version is a dict lookup per issue. Without a client (local mode) only
+    previously cached catalogs are used and names are parsed directly."""
+
+    def __init__(self, base_url, client=None, cache=None):
+        # online and local runs must agree on the cache key
+        self.base_url = (base_url or "").rstrip("/")
+        self.client = client
+        self.cache = cache
+        self._projects = {}
+        self._lock = threading.Lock()
+        self.stats = {"projects": 0, "versions": 0, "errors": 0}
+
+    def _fetch(self, project):
+        path = f"/rest/api/2/project/{urllib.parse.quote(project)}/versions"
+        key = QueryCache.make_key(self.base_url, "versions", project.upper())
+        if self.client is None:
+            return (self.cache.get(key) if self.cache else None) or []
+        fetch = lambda: self.client.request("GET", path)
+        return self.cache.get_or_fetch(key, fetch) if self.cache else fetch()
+
+    def load(self, project):
+        project = project.upper()
+        with self._lock:
+            if project in self._projects:
+                return self._projects[project]
+        try:
+            versions = self._fetch(project)
+        except RuntimeError:
+            versions = []
+            with self._lock:
+                self.stats["errors"] += 1
+        keys = {}
+        # Jira returns versions in the project's release sequence, which breaks ties
+        for seq, v in enumerate(versions if isinstance(versions, list) else []):
+            name = v.get("name") if isinstance(v, dict) else None
+            if name:
+                keys[name] = (version_key(name) or ((), 0, ()), seq, v.get("releaseDate") or "")
+        with self._lock:
+            if project not in self._projects:
+                self._projects[project] = keys
+                self.stats["projects"] += 1
+                self.stats["versions"] += len(keys)
+            return self._projects[project]
+
+    def load_all(self, projects):
+        for project in projects:
+            self.load(project)
+
+    def _entry(self, project, name):
+        entries = self.load(project)
+        if name in entries:
+            return entries[name]
+        # the customer's version is often written differently from the release name
+        wanted = version_key(name)
+        if wanted is None:
+            return None
+        return next((e for e in entries.values() if e[0] == wanted), None)
+
+    def is_later(self, project, name, other):
+        """Whether release `name` shipped after `other`, or None when unknown.
+
+        Two catalogued releases compare by releaseDate, then by the project's
+        release sequence; version numbers are only a fallback for releases missing
+        from the catalog, since release names do not always sort like the releases."""
+        fixed, base = self._entry(project, name), self._entry(project, other)
+        if fixed is not None and base is not None:
+            if fixed[2] and base[2] and fixed[2] != base[2]:
+                return fixed[2] > base[2]
+            return fixed[1] > base[1]
+        fixed_key, base_key = version_key(name), version_key(other)
+        if fixed_key is None or base_key is None:
+            return None
+        return fixed_key > base_key
+
+    def latest(self, project, fix_versions):
+        names = [v.get("name") for v in fix_versions or [] if isinstance(v, dict) and v.get("name")]
+        # ordered like is_later, so the reported release is the one availability is judged on
+        latest = ""
+        for name in names:
+            if not latest or self.is_later(project, name, latest):
+                latest = name
+        return latest
+
+    def report(self):
+        return dict(self.stats)
+
+
+def fetch_candidate_pages(client, jql, pages, page_size, fields=None, workers=4):
+    fields = fields or LIGHT_FIELDS
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, pages))) as pool:
+        results = list(pool.map(lambda i: client.search(jql, page_size, fields, start_at=i * page_size), range(pages)))
+    candidates = []
+    seen = set()
+    total = 0
+    for page in results:
+        total = max(total, int(page.get("total", 0) or 0))
+        for item in page.get("issues", []) or []:
+            # results can shift between pages while issues are being updated
+            if item.get("key") not in seen:
+                seen.add(item.get("key"))
+                candidates.append(item)
+    return candidates, total
+
+
+def fetch_issue_fields(client, keys, fields):
+    if not keys:
+        return {}
+    jql = "key in (%s)" % ", ".join(keys)
+    result = client.search(jql, len(keys), fields)
+    return {item.get("key"): item.get("fields", {}) or {} for item in result.get("issues", []) or []}
+
+
+def fetch_latest_comments(client, key, max_comments=3):
+    page = client.comments(key, max_results=max_comments)
+    # newest first from the API; keep Jira's usual ascending order for _extract_solution_summary
+    comments = list(reversed(page.get("comments", []) or []))
+    return {"comments": comments, "total": page.get("total", len(comments))}
+
+
+def hydrate_issues(client, items, fields, fetched_fields, max_comments=3, workers=4):
+    keys = [item.get("key") for item in items]
+    bulk_fields = [f for f in fields if f not in fetched_fields and f != "comment"]
+    want_comments = "comment" in fields and "comment" not in fetched_fields
+    stats = {"bulk_fields": bulk_fields, "comments_fetched": 0}
+    if not keys or (not bulk_fields and not want_comments):
+        return items, stats
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        bulk_job = pool.submit(fetch_issue_fields, client, keys, bulk_fields) if bulk_fields else None
+        comment_jobs = {}
+        if want_comments:
+            comment_jobs = {k: pool.submit(fetch_latest_comments, client, k, max_comments) for k in keys}
+        bulk = bulk_job.result() if bulk_job else {}
+        comments = {k: job.result() for k, job in comment_jobs.items()}
+
+    hydrated = []
+    for item in items:
+        key = item.get("key")
+        merged = dict(item.get("fields", {}) or {})
+        merged.update(bulk.get(key, {}))
+        if key in comments:
+            merged["comment"] = comments[key]
+        hydrated.append({"key": key, "fields": merged})
+    stats["comments_fetched"] = len(comments)
+    return hydrated, stats
+
+
+def _ranked_items(items, keywords, index=None):
+    by_key = {item.get("key"): item for item in items}
+    return [by_key[i["key"]] for i in rank_issues(items, keywords, index=index)]
+
+
+def _top_items(candidates, keywords, limit, index=None):
+    return _ranked_items(candidates, keywords, index)[:limit]
+
+
+def _has_fix(item):
+    return bool((item.get("fields") or {}).get("fixVersions"))
+
+
+def _prefer_fixed(groups):
+    # a duplicate that records a fix version tells the reader more than an unfixed leader
+    out = []
+    for rep, dups in groups:
+        if not _has_fix(rep):
+            fixed = next((d for d in dups if _has_fix(d)), None)
+            if fixed is not None:
+                rep, dups = fixed, [rep] + [d for d in dups if d is not fixed]
+        out.append((rep, dups))
+    return out
+
+
+def _merge_groups(groups, duplicates):
+    # fold duplicate lists of absorbed representatives into their new leader
+    reps = []
+    for rep, dups in _prefer_fixed(groups):
+        merged = duplicates.setdefault(rep.get("key"), [])
+        for dup in dups:
+            merged.append(dup.get("key"))
+            merged.extend(duplicates.pop(dup.get("key"), []))
+        reps.append(rep)
+    return reps
+
+
+def _recheck_members(client, reps, members, duplicates, args, fields, first_fields):
+    """Re-cluster hydrated representatives with the members they absorbed on first-phase
+    fields alone, now that both sides carry descriptions and fix versions.
+
+    Returns (reps, released, comments_fetched); released items no longer match their
+    leader and go back into the candidate queue."""
+    absorbed = {}
+    for rep in reps:
+        group = members.pop(rep.get("key"), [])
+        if group:
+            absorbed[rep.get("key")] = group
+    flat = [m for group in absorbed.values() for m in group]
+    if not flat:
+        return reps, [], 0
+    # members only need the bulk fields to be compared; comments are fetched for new leaders
+    hydrated, _ = hydrate_issues(client, flat, fields, list(first_fields) + ["comment"], workers=args.workers)
+    by_key = {m.get("key"): m for m in hydrated}
+    groups = []
+    released = []
+    for rep in reps:
+        if rep.get("key") not in absorbed:
+            groups.append((rep, []))
+            continue
+        duplicates.pop(rep.get("key"), None)
+        regrouped = collapse_duplicates([rep] + [by_key[m.get("key")] for m in absorbed[rep.get("key")]], args.dedupe_distance)
+        groups.append(regrouped[0])
+        released.extend(regrouped[1:])
+    groups = _prefer_fixed(groups)
+    swapped = [rep for (rep, _), old in zip(groups, reps) if rep is not old]
+    comments_fetched = 0
+    if swapped and "comment" in fields:
+        with_comments, swap_stats = hydrate_issues(
+            client, swapped, ["comment"], [], max_comments=args.comments, workers=args.workers
+        )
+        comments_fetched = swap_stats["comments_fetched"]
+        by_key = {item.get("key"): item for item in with_comments}
+        groups = [(by_key.get(rep.get("key"), rep), dups) for rep, dups in groups]
+    return _merge_groups(groups, duplicates), _merge_groups(released, duplicates), comments_fetched
+
+
+def dedupe_top_items(client, candidates, keywords, args, fields, first_fields, index=None):
+    """Collapse near-duplicates, hydrate the top-K representatives and backfill.
+
+    The first pass only sees first-phase fields (usually just the summary), so each
+    hydrated representative is re-checked against the members it absorbed; members
+    that diverge on the description are released back into the queue. The
+    representatives are then clustered again and any slots freed up are refilled
+    from the next candidates."""
+    groups = _prefer_fixed(collapse_duplicates(_ranked_items(candidates, keywords, index), args.dedupe_distance))
+    members = {rep.get("key"): dups for rep, dups in groups}
+    duplicates = {}
+    pending = _merge_groups(groups, duplicates)
+    reps = []
+    stats = {"bulk_fields": [], "comments_fetched": 0}
+    backfilled = 0
+    released = 0
+    rounds = 0
+    while pending and len(reps) < args.max and rounds < 3:
+        batch, pending = pending[: args.max - len(reps)], pending[args.max - len(reps) :]
+        if rounds:
+            backfilled += len(batch)
+        hydrated, batch_stats = hydrate_issues(
+            client, batch, fields, first_fields, max_comments=args.comments, workers=args.workers
+        )
+        stats["bulk_fields"] = batch_stats["bulk_fields"]
+        stats["comments_fetched"] += batch_stats["comments_fetched"]
+        hydrated, split, comments_fetched = _recheck_members(
+            client, hydrated, members, duplicates, args, fields, first_fields
+        )
+        stats["comments_fetched"] += comments_fetched
+        # split-off members ranked right next to their old leader
+        pending = split + pending
+        released += len(split)
+        reps = _merge_groups(
+            collapse_duplicates(_ranked_items(reps + hydrated, keywords, index), args.dedupe_distance), duplicates
+        )
+        rounds += 1
+    collapsed = sum(len(v) for v in duplicates.values())
+    stats["dedupe"] = {
+        "distance": args.dedupe_distance,
+        "collapsed": collapsed,
+        "released": released,
+        "backfilled": backfilled,
+        "rounds": rounds,
+    }
+    return reps, {k: v for k, v in duplicates.items() if v}, stats
+
+
+def fetch_candidates(client, queries, args, fields):
+    def run(jql):
+        if args.pages > 0:
+            return fetch_candidate_pages(client, jql, args.pages, args.page_size, fields, workers=args.workers)
+        page = client.search(jql, max(args.candidates, args.max), fields)
+        return page.get("issues", []) or [], int(page.get("total", 0) or 0)
+
+    if len(queries) == 1:
+        results = [run(queries[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=max(1, min(args.workers, len(queries)))) as pool:
+            results = list(pool.map(run, queries))
+
+    merged = []
+    seen = set()
+    per_query = []
+    for jql, (items, total) in zip(queries, results):
+        per_query.append({"jql": jql, "candidates": len(items), "total": total})
+        for item in items:
+            if item.get("key") not in seen:
+                seen.add(item.get("key"))
+                merged.append(item)
+    return merged, per_query
+
+
+async def _gather_projects(client, projects, args, fields):
+    async def run(project, queries):
+        start = time.monotonic()
+        items, per_query = await asyncio.to_thread(fetch_candidates, client, queries, args, fields)
+        return project, items, per_query, int((time.monotonic() - start) * 1000)
+
+    return await asyncio.gather(*(run(p, qs) for p, qs in projects.items()))
+
+
+def fetch_project_candidates(client, projects, args, fields):
+    """Run each project's queries concurrently over the shared client pool.
+
+    Total latency follows the slowest project rather than one combined
+    `project in (...)` query spanning differently configured projects."""
+    results = asyncio.run(_gather_projects(client, projects, args, fields))
+    merged = []
+    seen = set()
+    per_query = []
+    per_project = []
+    for project, items, queries, elapsed_ms in results:
+        per_query.extend(queries)
+        per_project.append(
+            {
+                "project": project,
+                "candidates": len(items),
+                "total": sum(q["total"] for q in queries),
+                "elapsed_ms": elapsed_ms,
+            }
+        )
+        for item in items:
+            if item.get("key") not in seen:
+                seen.add(item.get("key"))
+                merged.append(item)
+    return merged, per_query, per_project
+
+
+def search_jira(client, args, plan, keywords, fields, catalog=None):
+    pool_mode = args.pages > 0
+    first_fields = LIGHT_FIELDS if pool_mode else [f for f in fields if f not in LAZY_FIELDS]
+    per_project = None
+    if plan.get("projects"):
+        candidates, per_query, per_project = fetch_project_candidates(client, plan["projects"], args, first_fields)
+    else:
+        candidates, per_query = fetch_candidates(client, plan["queries"], args, first_fields)
+    # term statistics come from the whole pool; the hydrated top-K alone is too small for stable IDF
+    index = BM25Index([_issue_text(item.get("fields", {}) or {}) for item in candidates])
+    duplicates = {}
+    if args.no_dedupe:
+        top = _top_items(candidates, keywords, args.max, index)
+        hydrated, stats = hydrate_issues(
+            client, top, fields, first_fields, max_comments=args.comments, workers=args.workers
+        )
+    else:
+        hydrated, duplicates, stats = dedupe_top_items(client, candidates, keywords, args, fields, first_fields, index)
+    issues = _attach_duplicates(rank_issues(hydrated, keywords, catalog, index), duplicates)
+    info = {
+        "mode": "pool" if pool_mode else "two_phase",
+        "first_phase_fields": first_fields,
+        "keywords": plan["keywords"],
+        "dropped_keywords": plan["dropped_keywords"],
+        "boost_keywords": plan["boost_keywords"],
+        "queries": per_query,
+    }
+    if pool_mode:
+        info.update({"pages": args.pages, "page_size": args.page_size})
+    if per_project is not None:
+        info["projects"] = per_project
+    info.update(stats)
+    return {
+        "jql": plan["jql"],
+        "count": len(issues),
+        "candidates": len(candidates),
+        "issues": issues,
+        "plan": info,
     }
-    data = json.dumps(payload).encode("utf-8")
-    url = urllib.parse.urljoin(base_url, "/rest/api/2/search")
-    req = urllib.request.Request(url, data=data, method="POST")
-    req.add_header("Authorization", f"Basic {token}")
-    req.add_header("Content-Type", "application/json")
 
+
+def _attach_duplicates(issues, duplicates):
+    for issue in issues:
+        issue["duplicates"] = duplicates.get(issue["key"], [])
+    return issues
+
+
+def _issue_text(fields_obj):
+    summary = fields_obj.get("summary") or ""
+    # summary is repeated so it weighs more than long descriptions/comments
+    return "\n".join([summary, summary, _safe_text(fields_obj.get("description")), _comment_text(fields_obj)])
+
+
+def rank_issues(items, keywords, catalog=None, index=None):
+    """Rank `items` by BM25 against `keywords`; with `index` (built over the whole
+    candidate pool) the items are scored against the pool's term statistics."""
+    texts = [_issue_text(item.get("fields", {}) or {}) for item in items]
+    query = []
+    for k in keywords:
+        query.extend(_analyze(k))
+    scores = index.score_docs(texts, query) if index is not None else BM25Index(texts).scores(query)
+    issues = [_summarize_issue(item, score, catalog) for item, score in zip(items, scores)]
+    issues.sort(key=lambda x: x["updated"], reverse=True)
+    issues.sort(key=lambda x: x["similarity"], reverse=True)
+    return issues
+
+
+def _summarize_issue(item, similarity, catalog=None):
+    fields_obj = item.get("fields", {})
+    summary = fields_obj.get("summary") or ""
+    solution_summary = ""
+    if isinstance(fields_obj.get("comment"), dict):
+        solution_summary = _extract_solution_summary(fields_obj.get("comment", {}))
+
+    issuetype = fields_obj.get("issuetype", {}) or {}
+    labels = fields_obj.get("labels", []) or []
+    bug_flag = False
+    if isinstance(issuetype, dict) and "bug" in (issuetype.get("name", "").lower()):
+        bug_flag = True
+    if any("bug" in str(l).lower() for l in labels):
+        bug_flag = True
+
+    if catalog is not None:
+        fix_version = catalog.latest(item.get("key", "").split("-", 1)[0], fields_obj.get("fixVersions", []))
+    else:
+        fix_version = _latest_fix_version(fields_obj.get("fixVersions", []))
+    resolution = fields_obj.get("resolution", {}) or {}
+    resolution_summary = resolution.get("name") if isinstance(resolution, dict) else _safe_text(resolution)
+
+    return {
+        "key": item.get("key", ""),
+        "summary": summary,
+        "similarity": similarity,
+        "bug": "Yes" if bug_flag else "No",
+        "fix_version": fix_version,
+        "resolution": resolution_summary or "",
+        "solution_summary": solution_summary,
+        "status": (fields_obj.get("status") or {}).get("name", ""),
+        "updated": fields_obj.get("updated", ""),
+    }
+
+
+def mark_fix_availability(issues, catalog, customer_version):
+    """Flag issues fixed in a release newer than the customer's version.
+
+    Returns the overall "Existing Fix Version Available" answer: Yes when any
+    match is fixed in a later release, Unknown when fixes exist but the customer
+    version is missing or unparseable, otherwise No."""
+    has_fix = False
+    answer = "No"
+    for issue in issues:
+        name = issue.get("fix_version")
+        if not name:
+            issue["fixed_in_later_release"] = "Unknown"
+            continue
+        has_fix = True
+        later = catalog.is_later(issue["key"].split("-", 1)[0], name, customer_version) if customer_version else None
+        if later is None:
+            issue["fixed_in_later_release"] = "Unknown"
+        else:
+            issue["fixed_in_later_release"] = "Yes" if later else "No"
+        if issue["fixed_in_later_release"] == "Yes":
+            answer = "Yes"
+    if answer == "No" and has_fix and any(i["fixed_in_later_release"] == "Unknown" for i in issues if i.get("fix_version")):
+        answer = "Unknown"
+    return answer
+
+
+def _search_local(args, plan, keywords, project_keys, catalog=None):
+    db_path = args.db or _mirror_path()
+    if not os.path.exists(db_path):
+        print(json.dumps({"error": "jira mirror not found, run jira_sync.py first", "db": db_path}, ensure_ascii=False))
+        sys.exit(1)
+    fts_query = build_fts_query(plan["keywords"], stage=args.stage, module=args.module, version=args.version)
+    conn = open_mirror(db_path)
     try:
-        with urllib.request.urlopen(req, timeout=20) as resp:
-            raw = resp.read()
-        return json.loads(raw.decode("utf-8"))
-    except urllib.error.HTTPError as e:
-        body = e.read().decode("utf-8", errors="ignore")
-        raise RuntimeError(f"Jira HTTPError {e.code}: {body}")
-    except Exception as e:
-        raise RuntimeError(f"Jira request failed: {e}")
+        rows = search_mirror(conn, fts_query, max(args.candidates, args.max), project_keys)
+        synced = dict(conn.execute("SELECT project, synced_at FROM sync_state").fetchall())
+    finally:
+        conn.close()
+    index = BM25Index([_issue_text(row.get("fields", {}) or {}) for row in rows])
+    duplicates = {}
+    if not args.no_dedupe:
+        rows = _merge_groups(collapse_duplicates(_ranked_items(rows, keywords, index), args.dedupe_distance), duplicates)
+    issues = _attach_duplicates(
+        rank_issues(rows, keywords, catalog, index)[: args.max], {k: v for k, v in duplicates.items() if v}
+    )
+    return {
+        "jql": plan["jql"],
+        "count": len(issues),
+        "candidates": len(rows),
+        "issues": issues,
+        "source": "local",
+        "fts_query": fts_query,
+        "boost_keywords": plan["boost_keywords"],
+        "mirror": {"db": db_path, "synced_at": synced},
+    }
 
 
 def main():
     parser = argparse.ArgumentParser(description="Jira issue search for OnePro diagnostic")
     parser.add_argument("--base-url", default=os.environ.get("JIRA_BASE_URL", ""))
     parser.add_argument("--query", default="", help="free text query keywords")
+    parser.add_argument("--keywords", default="", help="comma separated keywords used verbatim")
+    parser.add_argument(
+        "--boost-keywords",
+        default="",
+        help="comma separated terms that only rank the results (e.g. derived from logs), never added to the query",
+    )
     parser.add_argument("--stage", default="")
     parser.add_argument("--module", default="")
     parser.add_argument("--version", default="")
     parser.add_argument("--project-keys", default=os.environ.get("JIRA_PROJECT_KEYS", "REQ,PRJ"))
     parser.add_argument("--max", type=int, default=5)
+    parser.add_argument("--candidates", type=int, default=20, help="candidate pool size reranked with BM25")
+    parser.add_argument("--pages", type=int, default=0, help="candidate-pool mode: light-field pages fetched in parallel")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--comments", type=int, default=3, help="latest comments fetched per returned issue")
+    parser.add_argument("--rate", type=float, default=float(os.environ.get("JIRA_RATE_LIMIT", "0")), help="max requests/s, 0 = unlimited")
+    parser.add_argument("--burst", type=int, default=0)
+    parser.add_argument("--max-in-flight", type=int, default=int(os.environ.get("JIRA_MAX_IN_FLIGHT", "4")))
+    parser.add_argument("--max-retries", type=int, default=4, help="retries on 429/502/503/504")
+    parser.add_argument("--cache-ttl", type=float, default=float(os.environ.get("JIRA_CACHE_TTL", "600")))
+    parser.add_argument("--stale-ttl", type=float, default=float(os.environ.get("JIRA_CACHE_STALE_TTL", "3600")))
+    parser.add_argument("--refresh", action="store_true", help="bypass cached results and refetch")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument(
+        "--versions-ttl",
+        type=float,
+        default=float(os.environ.get("JIRA_VERSIONS_TTL", "86400")),
+        help="seconds a project's version catalog is reused",
+    )
+    parser.add_argument("--no-version-catalog", action="store_true", help="order fix versions by releaseDate only")
     parser.add_argument("--fields", default="")
-    parser.add_argument("--print-jql", action="store_true")
+    parser.add_argument("--print-jql", action="store_true", help="print the planned JQL (one line per fan-out query)")
+    parser.add_argument("--max-keywords", type=int, default=MAX_JQL_KEYWORDS, help="keywords kept in JQL; --query terms always, --keywords fill the rest rarest first")
+    parser.add_argument("--fan-out", type=int, default=1, help="split keywords into N smaller concurrent queries")
+    parser.add_argument(
+        "--per-project",
+        action="store_true",
+        default=os.environ.get("JIRA_PER_PROJECT", "") not in ("", "0"),
+        help="query each project concurrently instead of one project in (...) query",
+    )
+    parser.add_argument("--dedupe-distance", type=int, default=DEDUPE_DISTANCE, help="SimHash bits within which issues are near-duplicates")
+    parser.add_argument("--no-dedupe", action="store_true", help="keep near-duplicate issues as separate results")
     parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--connect-timeout", type=float, default=float(os.environ.get("JIRA_CONNECT_TIMEOUT", "5")))
+    parser.add_argument("--read-timeout", type=float, default=float(os.environ.get("JIRA_READ_TIMEOUT", "20")))
+    parser.add_argument("--local", action="store_true", help="search the local mirror built by jira_sync.py")
+    parser.add_argument("--db", default="", help="mirror database path (default $JIRA_MIRROR_DB)")
 
     args = parser.parse_args()
 
     base_url = args.base_url or ""
-    if not base_url:
+    if not base_url and not args.local:
         print(json.dumps({"error": "missing base url"}, ensure_ascii=False))
         sys.exit(1)
 
     user = os.environ.get("JIRA_USER", "")
     password = os.environ.get("JIRA_PASS", "")
-    if not user or not password:
+    if (not user or not password) and not args.local:
         print(json.dumps({"error": "missing JIRA_USER/JIRA_PASS"}, ensure_ascii=False))
         sys.exit(1)
 
     keywords = _tokenize(args.query)
     if args.query and not keywords:
         keywords = [args.query]
+    query_terms = list(keywords)
+    for k in args.keywords.split(","):
+        k = k.strip().lower()
+        if k and k not in keywords:
+            keywords.append(k)
 
     project_keys = [k.strip() for k in args.project_keys.split(",") if k.strip()]
 
-    jql = build_jql(
-        keywords=keywords,
+    plan = plan_queries(
+        query_terms,
         stage=args.stage,
         module=args.module,
         version=args.version,
         project_keys=project_keys,
+        max_keywords=args.max_keywords,
+        fan_out=args.fan_out,
+        per_project=args.per_project and not args.local,
+        derived_keywords=keywords[len(query_terms) :],
+        boost_keywords=[k.strip().lower() for k in args.boost_keywords.split(",") if k.strip()],
     )
+    jql = plan["jql"]
+    keywords = keywords + plan["boost_keywords"]
 
     fields = DEFAULT_FIELDS
     if args.fields:
         fields = [f.strip() for f in args.fields.split(",") if f.strip()]
 
     if args.print_jql:
-        print(jql)
+        for q in plan["queries"]:
+            print(q)
         if args.dry_run:
             return
 
     if args.dry_run:
-        print(json.dumps({"jql": jql, "dry_run": True}, ensure_ascii=False, indent=2))
+        print(json.dumps({"jql": jql, "dry_run": True, "plan": plan}, ensure_ascii=False, indent=2))
         return
 
-    result = request_jira(base_url, user, password, jql, args.max, fields)
-
-    issues = []
-    for item in result.get("issues", []):
-        fields_obj = item.get("fields", {})
-        summary = fields_obj.get("summary") or ""
-        description = fields_obj.get("description") or ""
-        comments = ""
-        solution_summary = ""
-        if isinstance(fields_obj.get("comment"), dict):
-            bodies = []
-            for c in fields_obj.get("comment", {}).get("comments", []):
-                bodies.append(c.get("body") or "")
-            comments = "\n".join(bodies)
-            solution_summary = _extract_solution_summary(fields_obj.get("comment", {}))
-
-        issue_text = "\n".join([summary, _safe_text(description), comments])
-        similarity = _compute_similarity(keywords, issue_text)
-
-        issuetype = fields_obj.get("issuetype", {}) or {}
-        labels = fields_obj.get("labels", []) or []
-        bug_flag = False
-        if isinstance(issuetype, dict) and "bug" in (issuetype.get("name", "").lower()):
-            bug_flag = True
-        if any("bug" in str(l).lower() for l in labels):
-            bug_flag = True
-
-        fix_version = _latest_fix_version(fields_obj.get("fixVersions", []))
-        resolution = fields_obj.get("resolution", {}) or {}
-        resolution_summary = resolution.get("name") if isinstance(resolution, dict) else _safe_text(resolution)
-
-        issues.append(
-            {
-                "key": item.get("key", ""),
-                "summary": summary,
-                "similarity": similarity,
-                "bug": "Yes" if bug_flag else "No",
-                "fix_version": fix_version,
-                "resolution": resolution_summary or "",
-                "solution_summary": solution_summary,
-                "status": (fields_obj.get("status") or {}).get("name", ""),
-                "updated": fields_obj.get("updated", ""),
-            }
+    versions_cache = None
+    if not args.no_version_catalog:
+        versions_cache = QueryCache(
+            os.path.join(_cache_root(), "jira_versions"),
+            ttl=args.versions_ttl,
+            stale_ttl=args.versions_ttl,
+            refresh=args.refresh,
         )
 
-    output = {
-        "jql": jql,
-        "count": len(issues),
-        "issues": sorted(issues, key=lambda x: x["similarity"], reverse=True),
-    }
-
-    print(json.dumps(output, ensure_ascii=False, indent=2))
+    if args.local:
+        # catalogs are cached per Jira site; the mirror remembers which one it was synced from
+        base_url = base_url or mirror_meta(args.db or _mirror_path(), "base_url")
+        catalog = VersionCatalog(base_url, cache=versions_cache) if versions_cache else None
+        output = _search_local(args, plan, keywords, project_keys, catalog)
+        if catalog is not None:
+            output["existing_fix_version_available"] = mark_fix_availability(output["issues"], catalog, args.version)
+            output["versions"] = catalog.report()
+        print(json.dumps(output, ensure_ascii=False, indent=2))
+        return
 
+    cache = None
+    if not args.no_cache:
+        cache = QueryCache(
+            os.path.join(_cache_root(), "jira_query"),
+            ttl=args.cache_ttl,
+            stale_ttl=args.stale_ttl,
+            refresh=args.refresh,
+        )
+    client = JiraClient(
+        base_url,
+        user,
+        password,
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        pool_size=max(args.workers, args.max_in_flight, 1),
+        cache=cache,
+        rate=args.rate,
+        burst=args.burst or None,
+        max_in_flight=args.max_in_flight,
+        max_retries=args.max_retries,
+    )
+    catalog = VersionCatalog(base_url, client, versions_cache) if versions_cache else None
+    try:
+        if catalog is not None:
+            # the catalogs load alongside the search; cached for --versions-ttl afterwards
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                versions_job = pool.submit(catalog.load_all, project_keys)
+                output = search_jira(client, args, plan, keywords, fields, catalog)
+                versions_job.result()
+            output["existing_fix_version_available"] = mark_fix_availability(output["issues"], catalog, args.version)
+            output["versions"] = catalog.report()
+        else:
+            output = search_jira(client, args, plan, keywords, fields)
+        output["http"] = client.stats
+        output["cache"] = cache.report() if cache else {"enabled": False}
+        print(json.dumps(output, ensure_ascii=False, indent=2))
+        # stale entries are revalidated in the background; close() waits for them
+        sys.stdout.flush()
+    finally:
+        client.close()
+        if versions_cache is not None:
+            versions_cache.wait(timeout=args.read_timeout)
 
 if __name__ == "__main__":
     main()
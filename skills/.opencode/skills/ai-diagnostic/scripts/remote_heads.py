@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import subprocess
+import time
+
+DEFAULT_TTL = 600.0
+# a cached listing missing the wanted branch is re-listed at most this often
+MISSING_REFRESH_S = 60
+
+
+def _cache_dir():
+    return os.path.join(os.environ.get("ONEPRO_CACHE_DIR", "/tmp/onepro-cache"), "git_heads")
+
+
+def ls_remote_heads(repo_url: str, refs=(), cwd=None, timeout=20):
+    """{branch: sha} of the remote heads; raises when the remote is unreachable."""
+    out = subprocess.check_output(
+        ["git", "ls-remote", "--heads", repo_url] + list(refs),
+        cwd=cwd,
+        stderr=subprocess.STDOUT,
+        text=True,
+        timeout=timeout,
+    )
+    heads = {}
+    for line in out.splitlines():
+        parts = line.split("\t")
+        if len(parts) == 2 and parts[1].startswith("refs/heads/"):
+            heads[parts[1].replace("refs/heads/", "")] = parts[0]
+    return heads
+
+
+class HeadsCache:
+    """On-disk cache of `git ls-remote --heads` per repository, shared by
+    repo_locate.py and code_locate.py.
+
+    Entries live in $ONEPRO_CACHE_DIR/git_heads keyed by the credential-free
+    repo URL. Within `ttl` seconds no network call is made; past it the remote
+    is listed again, and an unreachable remote falls back to the old entry."""
+
+    def __init__(self, cache_dir=None, ttl=DEFAULT_TTL, refresh=False, timeout=20):
+        self.cache_dir = cache_dir or _cache_dir()
+        self.ttl = ttl
+        self.refresh = refresh
+        self.timeout = timeout
+
+    def _path(self, repo_url):
+        return os.path.join(self.cache_dir, hashlib.sha256(repo_url.encode("utf-8")).hexdigest() + ".json")
+
+    def _load(self, repo_url):
+        try:
+            with open(self._path(repo_url), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get("url") == repo_url else None
+
+    def _store(self, repo_url, heads):
+        path = self._path(repo_url)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"url": repo_url, "stored_at": time.time(), "heads": heads}, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def heads(self, repo_url, auth_url=None, refresh=False):
+        """Returns ({branch: sha}, info); info reports cached/age_s/stale/error."""
+        entry = None if (self.refresh or refresh) else self._load(repo_url)
+        if entry is not None:
+            age = time.time() - entry.get("stored_at", 0)
+            if age <= self.ttl:
+                return entry["heads"], {"cached": True, "age_s": int(age)}
+        try:
+            heads = ls_remote_heads(auth_url or repo_url, timeout=self.timeout)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as e:
+            entry = entry or self._load(repo_url)
+            if entry is not None:
+                age = time.time() - entry.get("stored_at", 0)
+                return entry["heads"], {"cached": True, "age_s": int(age), "stale": True, "error": str(e)[:200]}
+            return {}, {"cached": False, "error": str(e)[:200]}
+        self._store(repo_url, heads)
+        return heads, {"cached": False, "age_s": 0}
+
+    def resolve(self, repo_url, candidates, auth_url=None):
+        """Pick the first candidate branch present on the remote.
+
+        A cached listing that lacks the preferred candidate is refreshed (at most
+        once a minute), so a release branch created since the last listing is
+        still found."""
+        heads, info = self.heads(repo_url, auth_url)
+        if (
+            info.get("cached")
+            and not info.get("stale")
+            and info["age_s"] >= MISSING_REFRESH_S
+            and candidates
+            and candidates[0] not in heads
+        ):
+            heads, info = self.heads(repo_url, auth_url, refresh=True)
+            info["refreshed"] = True
+        return select_branch(candidates, heads), heads, info
+
+
+def select_branch(candidates, remote_branches):
+    for c in candidates:
+        if c in remote_branches:
+            return c
+    return candidates[0] if candidates else "master"
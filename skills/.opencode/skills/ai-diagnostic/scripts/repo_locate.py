@@ -2,10 +2,11 @@
 import argparse
 import json
 import os
-import subprocess
 import sys
 import urllib.parse
 
+from remote_heads import DEFAULT_TTL, HeadsCache
+
 REPO_MAP = {
     "newmuse": "hypermotion/newmuse",
     "owl": "hypermotion/owl",
@@ -51,31 +52,6 @@ def _branch_candidates(product: str, version: str):
     return candidates
 
 
-def _ls_remote_branches(repo_url: str):
-    try:
-        out = subprocess.check_output(
-            ["git", "ls-remote", "--heads", repo_url],
-            stderr=subprocess.STDOUT,
-            text=True,
-            timeout=15,
-        )
-    except Exception:
-        return []
-    branches = []
-    for line in out.splitlines():
-        parts = line.split("\t")
-        if len(parts) == 2 and parts[1].startswith("refs/heads/"):
-            branches.append(parts[1].replace("refs/heads/", ""))
-    return branches
-
-
-def _select_branch(candidates, remote_branches):
-    for c in candidates:
-        if c in remote_branches:
-            return c
-    return candidates[0] if candidates else "master"
-
-
 def main():
     parser = argparse.ArgumentParser(description="Locate repo and branch for OnePro modules")
     parser.add_argument("--module", required=True)
@@ -83,6 +59,13 @@ def main():
     parser.add_argument("--version", default="")
     parser.add_argument("--base-url", default=os.environ.get("GIT_BASE_URL", DEFAULT_BASE))
     parser.add_argument("--list-branches", action="store_true")
+    parser.add_argument(
+        "--heads-ttl",
+        type=float,
+        default=float(os.environ.get("GIT_HEADS_TTL", DEFAULT_TTL)),
+        help="seconds a cached branch listing is reused",
+    )
+    parser.add_argument("--refresh-heads", action="store_true", help="re-list remote branches, ignoring the cache")
     args = parser.parse_args()
 
     module_key = _normalize_module(args.module)
@@ -98,11 +81,12 @@ def main():
     candidates = _branch_candidates(args.product, args.version)
 
     remote_branches = []
+    heads_info = {"skipped": True}
     selected = candidates[0] if candidates else "master"
     if args.list_branches:
-        remote_branches = _ls_remote_branches(repo_url)
-        if remote_branches:
-            selected = _select_branch(candidates, remote_branches)
+        cache = HeadsCache(ttl=args.heads_ttl, refresh=args.refresh_heads, timeout=15)
+        selected, heads, heads_info = cache.resolve(f"{args.base_url}/{repo_path}.git", candidates, repo_url)
+        remote_branches = list(heads)
 
     output = {
         "module": args.module,
@@ -111,6 +95,7 @@ def main():
         "branch_candidates": candidates,
         "selected_branch": selected,
         "remote_branches": remote_branches,
+        "heads_cache": heads_info,
     }
 
     print(json.dumps(output, ensure_ascii=False, indent=2))
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# the skill scripts import each other as siblings
+SCRIPTS = Path(__file__).resolve().parent.parent / "skills" / ".opencode" / "skills" / "ai-diagnostic" / "scripts"
+sys.path.insert(0, str(SCRIPTS))
@@ -0,0 +1,30 @@
+import shutil
+
+import pytest
+
+import code_locate
+
+
+@pytest.mark.skipif(shutil.which("rg") is None, reason="ripgrep not installed")
+def test_rare_term_behind_common_terms_still_hits(tmp_path):
+    lines = [f's = "format volume for information {i}"\n' for i in range(200)]
+    lines.append("class DeltaUploader:\n    pass\n")
+    (tmp_path / "upload.py").write_text("".join(lines))
+    terms = ["volume", "for", "DeltaUploader"]
+
+    by_term, _ = code_locate._rg_hits(tmp_path, terms, {t: 5 for t in terms})
+
+    assert [h["line"] for h in by_term["DeltaUploader"]] == [201]
+    assert len(by_term["volume"]) == 5
+    assert len(by_term["for"]) == 5
+
+
+@pytest.mark.skipif(shutil.which("rg") is None, reason="ripgrep not installed")
+def test_overlapping_terms_are_attributed_to_each(tmp_path):
+    (tmp_path / "net.py").write_text('raise ConnectionError("x")\nconn = Connection()\n')
+    terms = ["Connection", "ConnectionError"]
+
+    by_term, _ = code_locate._rg_hits(tmp_path, terms, {t: 5 for t in terms})
+
+    assert [h["line"] for h in by_term["Connection"]] == [1, 2]
+    assert [h["line"] for h in by_term["ConnectionError"]] == [1]
@@ -0,0 +1,44 @@
+import sys
+import types
+
+import pytest
+
+import diagnose_pipeline
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture
+def eng_only_tesseract(monkeypatch, tmp_path):
+    calls = []
+    fake = types.ModuleType("pytesseract")
+    fake.TesseractError = RuntimeError
+
+    def image_to_string(img, lang="eng", config=""):
+        if "chi_sim" in lang:
+            raise fake.TesseractError("chi_sim.traineddata not found")
+        calls.append(lang)
+        return "ERROR volume attach failed"
+
+    fake.image_to_string = image_to_string
+    fake.get_languages = lambda config="": ["eng", "osd"]
+    monkeypatch.setitem(sys.modules, "pytesseract", fake)
+    monkeypatch.setattr(diagnose_pipeline, "_INSTALLED_LANGS", None)
+    monkeypatch.setenv("ONEPRO_CACHE_DIR", str(tmp_path / "cache"))
+    return calls
+
+
+def test_ocr_fallback_result_is_read_back_from_cache(eng_only_tesseract, tmp_path):
+    path = tmp_path / "shot.png"
+    Image.new("RGB", (200, 80), "white").save(path)
+
+    first = diagnose_pipeline._ocr_image(str(path), "chi_sim+eng")
+    second = diagnose_pipeline._ocr_image(str(path), "chi_sim+eng")
+
+    assert first["cached"] is False and first["lang"] == "eng"
+    assert second["cached"] is True and second["text"] == first["text"]
+    # only eng ever runs: no failed chi_sim attempt per region
+    assert eng_only_tesseract and set(eng_only_tesseract) == {"eng"}
+    calls = len(eng_only_tesseract)
+    diagnose_pipeline._ocr_image(str(path), "chi_sim+eng")
+    assert len(eng_only_tesseract) == calls
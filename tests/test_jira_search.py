@@ -0,0 +1,67 @@
+import jira_search
+
+
+def test_query_terms_survive_the_keyword_cap(monkeypatch, tmp_path):
+    monkeypatch.setenv("ONEPRO_CACHE_DIR", str(tmp_path))
+    derived = ["DeltaUploaderException", "VolumeAttachTimeout", "snapshot_manager", "qemu-monitor", "libvirtd"]
+
+    plan = jira_search.plan_queries(jira_search._tokenize("vm boot 蓝屏"), max_keywords=6, derived_keywords=derived)
+
+    assert plan["keywords"][:3] == ["vm", "boot", "蓝屏"]
+    assert len(plan["keywords"]) == 6
+    assert len(plan["dropped_keywords"]) == 2
+    for term in ("vm", "boot", "蓝屏"):
+        assert f'text ~ "{term}"' in plan["jql"]
+
+
+def test_boost_keywords_never_reach_the_jql(monkeypatch, tmp_path):
+    monkeypatch.setenv("ONEPRO_CACHE_DIR", str(tmp_path))
+
+    plan = jira_search.plan_queries(["蓝屏"], boost_keywords=["DeltaUploaderException", "蓝屏"])
+
+    assert plan["keywords"] == ["蓝屏"]
+    assert plan["boost_keywords"] == ["DeltaUploaderException"]
+    assert "DeltaUploaderException" not in plan["jql"]
+
+
+class _Versions:
+    def __init__(self, versions):
+        self.versions = versions
+
+    def request(self, method, path):
+        return self.versions
+
+
+def test_latest_fix_version_follows_release_dates_not_names():
+    # 10.0-LTS was cut from the 9.x line and shipped before 9.5
+    catalog = jira_search.VersionCatalog(
+        "http://jira",
+        _Versions(
+            [
+                {"name": "10.0-LTS", "releaseDate": "2024-03-01"},
+                {"name": "9.5", "releaseDate": "2024-09-01"},
+            ]
+        ),
+    )
+    fix_versions = [{"name": "10.0-LTS"}, {"name": "9.5"}]
+
+    assert catalog.latest("PRJ", fix_versions) == "9.5"
+    assert catalog.is_later("PRJ", "9.5", "10.0-LTS") is True
+    assert catalog.latest("PRJ", [{"name": "7.1"}, {"name": "7.10"}]) == "7.10"
+
+
+def _issue(key, summary, updated):
+    return {"key": key, "fields": {"summary": summary, "updated": updated}}
+
+
+def test_top_k_is_scored_against_the_candidate_pool():
+    # "vm" is in every candidate, "deltauploader" only in one: the pool says which is informative
+    pool = [_issue(f"PRJ-{i}", f"vm host {i} slow", "2024-01-01") for i in range(20)]
+    common = _issue("PRJ-100", "vm crashed on restart", "2024-06-01")
+    rare = _issue("PRJ-101", "deltauploader crashed on restart", "2024-05-01")
+    index = jira_search.BM25Index([jira_search._issue_text(i["fields"]) for i in pool + [common, rare]])
+
+    ranked = jira_search.rank_issues([common, rare], ["vm", "deltauploader"], index=index)
+
+    assert [i["key"] for i in ranked] == ["PRJ-101", "PRJ-100"]
+    assert ranked[0]["similarity"] > ranked[1]["similarity"]